@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_call(item):
+    """Миниатюры, поставленные тестом, создаются до удаления временного
+    MEDIA_ROOT фикстурами."""
+    yield
+    from posts import thumbnails
+    thumbnails.wait()
@@ -0,0 +1,166 @@
+"""ASGI-приложение поверх WSGI-обработчика Django 2.2.
+
+В Django 2.2 нет ни ASGI-обработчика, ни асинхронных видов, поэтому
+виды выполняются в ограниченном пуле потоков, а соединения держит цикл
+событий ASGI-сервера (uvicorn, daphne, hypercorn). Медленный запрос
+занимает поток пула, а не процесс сервера; сверх пула запросы ждут в
+очереди, не открывая новых соединений с базой. Запрос целиком, от
+вызова вида до close() ответа, обрабатывается одним заданием пула;
+части ответа передаются циклу событий через asyncio.Queue по мере
+того, как их выдаёт WSGI-итератор, поэтому потоковые ответы не
+собираются в памяти.
+"""
+import asyncio
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from itertools import chain
+
+# Сколько частей ответа поток пула готовит впрок, пока клиент их не
+# забрал: медленный клиент не заставляет держать весь ответ в памяти.
+BUFFER_CHUNKS = 4
+
+
+def build_environ(scope, body):
+    """WSGI environ из ASGI scope и тела запроса."""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('127.0.0.1', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # PEP 3333: строки environ - байты, декодированные как latin-1.
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            environ[name] = value
+            continue
+        key = f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class WSGIBridge:
+    """ASGI-приложение, выполняющее WSGI-приложение в пуле потоков."""
+
+    def __init__(self, wsgi_application, executor=None, max_workers=None):
+        self.wsgi_application = wsgi_application
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f"Неподдерживаемый тип ASGI: {scope['type']}")
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def http(self, scope, receive, send):
+        body = BytesIO()
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body.write(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        environ = build_environ(scope, body.getvalue())
+        loop = asyncio.get_running_loop()
+        messages = asyncio.Queue()
+        slots = threading.Semaphore(BUFFER_CHUNKS)
+        stopped = threading.Event()
+
+        def put(message):
+            loop.call_soon_threadsafe(messages.put_nowait, message)
+
+        job = loop.run_in_executor(
+            self.executor, self.run, environ, put, slots, stopped
+        )
+        try:
+            while True:
+                message = await messages.get()
+                if message is None:
+                    break
+                await send(message)
+                if message['type'] == 'http.response.body':
+                    slots.release()
+        finally:
+            # Клиент ушёл или ответ отправлен: поток пула перестаёт
+            # читать тело и вызывает close().
+            stopped.set()
+            slots.release()
+            await job
+
+    def run(self, environ, put, slots, stopped):
+        """Обработка запроса в одном потоке пула.
+
+        Вызов приложения, чтение тела ответа и close() (сигнал
+        request_finished, после которого Django закрывает соединения с
+        базой) выполняются в одном потоке, как у WSGI-сервера. Сообщения
+        ASGI передаются циклу событий через put(); None - конец ответа.
+        """
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+
+        result = None
+        try:
+            result = self.wsgi_application(environ, start_response)
+            chunks = iter(result)
+            # Генератор может вызвать start_response при первой итерации.
+            first = next(chunks, b'')
+            put({
+                'type': 'http.response.start',
+                'status': response['status'],
+                'headers': response['headers'],
+            })
+            for chunk in chain([first], chunks):
+                if not chunk:
+                    continue
+                slots.acquire()
+                if stopped.is_set():
+                    return
+                put({
+                    'type': 'http.response.body',
+                    'body': chunk,
+                    'more_body': True,
+                })
+            put({'type': 'http.response.body', 'body': b''})
+        finally:
+            close = getattr(result, 'close', None)
+            if close is not None:
+                close()
+            put(None)
@@ -0,0 +1,211 @@
+"""Кеш в памяти процесса с LRU-вытеснением по объёму.
+
+В отличие от LocMemCache размер кеша ограничивается в байтах
+(OPTIONS['MAX_BYTES']), а при переполнении вытесняются давно не
+читавшиеся записи. По каждому префиксу ключа ('feed', 'post_card',
+'version', ...) считаются попадания, промахи и вытеснения. Если задан
+OPTIONS['STATS_DIR'], процесс раз в STATS_INTERVAL секунд сохраняет
+туда свою статистику, а команда cache_stats её суммирует.
+"""
+import json
+import os
+import pickle
+import re
+import time
+from collections import Counter, OrderedDict, defaultdict
+from threading import Lock, get_ident
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+MAX_BYTES = 64 * 1024 * 1024
+STATS_INTERVAL = 60
+COUNTERS = ('hits', 'misses', 'evictions')
+
+_stores = {}
+
+
+class Store:
+    """Записи и статистика одного именованного кеша."""
+
+    def __init__(self):
+        self.data = OrderedDict()
+        self.size = 0
+        self.stats = defaultdict(Counter)
+        self.lock = Lock()
+        self.dumped = time.time()
+
+
+def prefix_of(key):
+    """Префикс ключа до первого ':' или '.'."""
+    return re.split(r'[:.]', key, 1)[0]
+
+
+class LRUCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, name, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.name = name or 'default'
+        self.max_bytes = int(options.get('MAX_BYTES', MAX_BYTES))
+        self.stats_dir = options.get('STATS_DIR')
+        self.stats_interval = options.get('STATS_INTERVAL', STATS_INTERVAL)
+        self._store = _stores.setdefault(self.name, Store())
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        full_key = self.make_key(key, version=version)
+        self.validate_key(full_key)
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        with self._store.lock:
+            if self._get(full_key) is not None:
+                return False
+            self._set(full_key, prefix_of(key), pickled, timeout)
+            return True
+
+    def get(self, key, default=None, version=None):
+        full_key = self.make_key(key, version=version)
+        self.validate_key(full_key)
+        prefix = prefix_of(key)
+        with self._store.lock:
+            entry = self._get(full_key)
+            counter = 'misses' if entry is None else 'hits'
+            self._store.stats[prefix][counter] += 1
+        self._maybe_dump()
+        if entry is None:
+            return default
+        return pickle.loads(entry[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        full_key = self.make_key(key, version=version)
+        self.validate_key(full_key)
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        with self._store.lock:
+            self._set(full_key, prefix_of(key), pickled, timeout)
+        self._maybe_dump()
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        full_key = self.make_key(key, version=version)
+        with self._store.lock:
+            entry = self._get(full_key)
+            if entry is None:
+                return False
+            pickled, _, prefix = entry
+            self._store.data[full_key] = (
+                pickled, self.get_backend_timeout(timeout), prefix
+            )
+            return True
+
+    def incr(self, key, delta=1, version=None):
+        full_key = self.make_key(key, version=version)
+        self.validate_key(full_key)
+        with self._store.lock:
+            entry = self._get(full_key)
+            if entry is None:
+                raise ValueError(f"Key '{full_key}' not found")
+            pickled, expires, prefix = entry
+            value = pickle.loads(pickled) + delta
+            self._delete(full_key)
+            pickled = pickle.dumps(value, self.pickle_protocol)
+            self._store.data[full_key] = (pickled, expires, prefix)
+            self._store.size += self._entry_size(full_key, pickled)
+        return value
+
+    def has_key(self, key, version=None):
+        full_key = self.make_key(key, version=version)
+        self.validate_key(full_key)
+        with self._store.lock:
+            return self._get(full_key) is not None
+
+    def delete(self, key, version=None):
+        full_key = self.make_key(key, version=version)
+        self.validate_key(full_key)
+        with self._store.lock:
+            self._delete(full_key)
+
+    def clear(self):
+        with self._store.lock:
+            self._store.data.clear()
+            self._store.size = 0
+
+    def stats(self):
+        """Объём кеша и счётчики по префиксам ключей."""
+        with self._store.lock:
+            return {
+                'pid': os.getpid(),
+                'entries': len(self._store.data),
+                'bytes': self._store.size,
+                'max_bytes': self.max_bytes,
+                'prefixes': {
+                    prefix: {name: counter[name] for name in COUNTERS}
+                    for prefix, counter in self._store.stats.items()
+                },
+            }
+
+    def reset_stats(self):
+        with self._store.lock:
+            self._store.stats.clear()
+
+    def stats_path(self, pid=None):
+        """Файл статистики процесса pid (по умолчанию текущего)."""
+        if pid is None:
+            pid = os.getpid()
+        return os.path.join(self.stats_dir, f'{self.name}-{pid}.json')
+
+    def dump_stats(self):
+        """Сохранение статистики процесса в STATS_DIR."""
+        os.makedirs(self.stats_dir, exist_ok=True)
+        path = self.stats_path()
+        # У каждого потока свой временный файл: с общим второй
+        # os.replace падал бы с FileNotFoundError.
+        tmp_path = f'{path}.{get_ident()}.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(self.stats(), file)
+        os.replace(tmp_path, path)
+
+    def _maybe_dump(self):
+        if not self.stats_dir:
+            return
+        now = time.time()
+        with self._store.lock:
+            if now - self._store.dumped < self.stats_interval:
+                return
+            self._store.dumped = now
+        self.dump_stats()
+
+    @staticmethod
+    def _entry_size(key, pickled):
+        return len(key) + len(pickled)
+
+    def _get(self, key):
+        """Живая запись с обновлением её места в очереди LRU."""
+        entry = self._store.data.get(key)
+        if entry is None:
+            return None
+        expires = entry[1]
+        if expires is not None and expires <= time.time():
+            self._delete(key)
+            return None
+        self._store.data.move_to_end(key)
+        return entry
+
+    def _set(self, key, prefix, pickled, timeout):
+        self._delete(key)
+        size = self._entry_size(key, pickled)
+        if size > self.max_bytes:
+            self._store.stats[prefix]['evictions'] += 1
+            return
+        self._store.data[key] = (
+            pickled, self.get_backend_timeout(timeout), prefix
+        )
+        self._store.size += size
+        while self._store.size > self.max_bytes:
+            old_key, (old_pickled, _, old_prefix) = (
+                self._store.data.popitem(last=False)
+            )
+            self._store.size -= self._entry_size(old_key, old_pickled)
+            self._store.stats[old_prefix]['evictions'] += 1
+
+    def _delete(self, key):
+        entry = self._store.data.pop(key, None)
+        if entry is not None:
+            self._store.size -= self._entry_size(key, entry[0])
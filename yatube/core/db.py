@@ -0,0 +1,26 @@
+"""Настройка соединений с SQLite через PRAGMA из settings.SQLITE_PRAGMAS."""
+import re
+
+from django.conf import settings
+
+PRAGMA_VALUE = re.compile(r'^-?\w+$')
+
+
+def pragma_statements(pragmas):
+    """Команды PRAGMA; имена и значения проверяются, их нельзя
+    передать параметрами запроса."""
+    statements = []
+    for name, value in pragmas.items():
+        if not name.isidentifier() or not PRAGMA_VALUE.match(str(value)):
+            raise ValueError(f'Некорректный PRAGMA: {name} = {value}')
+        statements.append(f'PRAGMA {name} = {value}')
+    return statements
+
+
+def configure_sqlite(sender, connection, **kwargs):
+    """Обработчик connection_created: PRAGMA для нового соединения."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(settings.SQLITE_PRAGMAS):
+            cursor.execute(statement)
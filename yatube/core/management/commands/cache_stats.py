@@ -0,0 +1,102 @@
+import glob
+import json
+import os
+import re
+from collections import Counter, defaultdict
+
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+from core.cache import COUNTERS, LRUCache
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Процесс есть, но принадлежит другому пользователю.
+        return True
+    return True
+
+
+class Command(BaseCommand):
+    help = (
+        'Выводит объём кеша LRUCache и попадания, промахи и вытеснения '
+        'по префиксам ключей, суммируя статистику процессов из STATS_DIR.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alias', default='default')
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Вывести статистику в JSON.'
+        )
+
+    def handle(self, *args, **options):
+        cache = caches[options['alias']]
+        if not isinstance(cache, LRUCache):
+            raise CommandError(
+                f"Кеш '{options['alias']}' не использует core.cache.LRUCache."
+            )
+        # Статистика самой команды берётся из памяти, а не из файла.
+        reports = [cache.stats()]
+        if cache.stats_dir:
+            reports.extend(self.read_reports(cache))
+        totals = defaultdict(Counter)
+        for report in reports:
+            for prefix, counters in report['prefixes'].items():
+                totals[prefix].update(counters)
+        summary = {
+            'processes': len(reports),
+            'entries': sum(report['entries'] for report in reports),
+            'bytes': sum(report['bytes'] for report in reports),
+            'max_bytes': cache.max_bytes,
+            'prefixes': {
+                prefix: dict(totals[prefix]) for prefix in sorted(totals)
+            },
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2))
+            return
+        self.stdout.write(
+            f"Процессов: {summary['processes']}, "
+            f"записей: {summary['entries']}, "
+            f"байт: {summary['bytes']} "
+            f"(предел {summary['max_bytes']} на процесс)"
+        )
+        self.stdout.write(
+            f"{'префикс':<20}" + ''.join(f'{name:>12}' for name in COUNTERS)
+            + f"{'hit rate':>12}"
+        )
+        for prefix, counters in summary['prefixes'].items():
+            hits, misses = counters.get('hits', 0), counters.get('misses', 0)
+            rate = hits / (hits + misses) if hits + misses else 0
+            self.stdout.write(
+                f'{prefix:<20}'
+                + ''.join(f'{counters.get(name, 0):>12}' for name in COUNTERS)
+                + f'{rate:>12.1%}'
+            )
+
+    def read_reports(self, cache):
+        """Статистика живых процессов; файлы завершившихся удаляются."""
+        name = re.compile(rf'{re.escape(cache.name)}-(\d+)\.json')
+        reports = []
+        for path in glob.glob(cache.stats_path('*')):
+            match = name.fullmatch(os.path.basename(path))
+            if match is None:
+                continue
+            pid = int(match.group(1))
+            if pid == os.getpid():
+                continue
+            if not process_alive(pid):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                continue
+            with open(path) as file:
+                reports.append(json.load(file))
+        return reports
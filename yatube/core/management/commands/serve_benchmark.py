@@ -0,0 +1,157 @@
+import asyncio
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import WSGIBridge, build_environ
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает WSGI-обработку (как gthread-воркер gunicorn) и ASGI '
+        '(core.asgi) при одинаковом числе потоков-обработчиков и большом '
+        'числе одновременных клиентов. Разница показывает накладные '
+        'расходы моста, а не выигрыш от размера пула. Запросы '
+        'выполняются в процессе, без сети.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=100)
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=settings.ASGI_THREADS,
+            help=(
+                'Потоки-обработчики: и WSGI (--threads gunicorn), '
+                'и пул ASGI.'
+            )
+        )
+        parser.add_argument(
+            '--delay',
+            type=float,
+            default=0,
+            help='Задержка ответа в секундах: медленный ввод-вывод.'
+        )
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        wsgi_application = get_wsgi_application()
+        delay = options['delay']
+
+        def application(environ, start_response):
+            if delay:
+                time.sleep(delay)
+            return wsgi_application(environ, start_response)
+
+        self.scope = {
+            'type': 'http',
+            'method': 'GET',
+            'path': options['path'],
+            'query_string': b'',
+            'headers': [(b'host', b'localhost')],
+        }
+        results = {
+            'wsgi': self.run_wsgi(application, options),
+            'asgi': self.run_asgi(application, options),
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name.upper()}: {result['rps']:.0f} запросов/с, "
+                f"p50 {result['p50']:.1f} мс, p95 {result['p95']:.1f} мс, "
+                f"p99 {result['p99']:.1f} мс"
+            )
+
+    def summary(self, latencies, elapsed):
+        return {
+            'rps': len(latencies) / elapsed,
+            'mean': statistics.mean(latencies) * 1000,
+            'p50': percentile(latencies, 50) * 1000,
+            'p95': percentile(latencies, 95) * 1000,
+            'p99': percentile(latencies, 99) * 1000,
+        }
+
+    def check_status(self, status):
+        if status != 200:
+            raise CommandError(
+                f"{self.scope['path']} отвечает {status}, а не 200."
+            )
+
+    def run_wsgi(self, application, options):
+        # Клиентов - concurrency, обрабатывают их threads потоков, как
+        # в gthread-воркере: остальные ждут в очереди, как в backlog
+        # сокета. Потоков столько же, сколько в пуле ASGI, иначе
+        # сравнивались бы размеры пулов, а не серверы.
+        workers = threading.BoundedSemaphore(options['threads'])
+
+        def request():
+            start = time.perf_counter()
+            statuses = []
+            with workers:
+                result = application(
+                    build_environ(self.scope, b''),
+                    lambda status, headers, exc_info=None: statuses.append(
+                        int(status.split(' ', 1)[0])
+                    )
+                )
+                try:
+                    for _ in result:
+                        pass
+                finally:
+                    result.close()
+            self.check_status(statuses[0])
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            futures = [
+                pool.submit(request) for _ in range(options['requests'])
+            ]
+            latencies = [future.result() for future in futures]
+        return self.summary(latencies, time.perf_counter() - start)
+
+    def run_asgi(self, application, options):
+        bridge = WSGIBridge(application, max_workers=options['threads'])
+
+        async def request(semaphore):
+            async with semaphore:
+                start = time.perf_counter()
+                messages = []
+
+                async def receive():
+                    return {'type': 'http.request', 'body': b''}
+
+                async def send(message):
+                    messages.append(message)
+
+                await bridge(self.scope, receive, send)
+                self.check_status(messages[0]['status'])
+                return time.perf_counter() - start
+
+        async def load():
+            semaphore = asyncio.Semaphore(options['concurrency'])
+            return await asyncio.gather(*(
+                request(semaphore) for _ in range(options['requests'])
+            ))
+
+        start = time.perf_counter()
+        try:
+            latencies = asyncio.run(load())
+        finally:
+            bridge.executor.shutdown()
+        return self.summary(latencies, time.perf_counter() - start)
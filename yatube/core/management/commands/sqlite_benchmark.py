@@ -0,0 +1,122 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.db import pragma_statements
+
+BATCH_SIZE = 20
+FEED_QUERY = (
+    'SELECT id, text FROM post WHERE pub_date < ? '
+    'ORDER BY pub_date DESC, id DESC LIMIT 10'
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает скорость чтения ленты из SQLite во время записи '
+        'с настройками по умолчанию и с settings.SQLITE_PRAGMAS. '
+        'Работает с отдельной временной базой.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=20000)
+        parser.add_argument('--readers', type=int, default=4)
+        parser.add_argument('--seconds', type=float, default=3)
+
+    def handle(self, *args, **options):
+        self.rows = options['rows']
+        for title, pragmas in (
+            ('По умолчанию', {}),
+            ('SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS),
+        ):
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'benchmark.sqlite3')
+                self.fill(path, pragmas, options['rows'])
+                result = self.run(
+                    path, pragmas, options['readers'], options['seconds']
+                )
+            seconds = result['seconds']
+            self.stdout.write(
+                f'{title}: чтений {result["reads"] / seconds:.0f}/с, '
+                f'записей {result["writes"] / seconds:.0f}/с, '
+                f'ошибок блокировки {result["locked"]}'
+            )
+
+    def connect(self, path, pragmas):
+        # Как у Django: timeout модуля sqlite3 по умолчанию - 5 секунд.
+        connection = sqlite3.connect(path, isolation_level=None)
+        for statement in pragma_statements(pragmas):
+            connection.execute(statement)
+        return connection
+
+    def fill(self, path, pragmas, rows):
+        connection = self.connect(path, pragmas)
+        connection.execute(
+            'CREATE TABLE post (id INTEGER PRIMARY KEY, text TEXT, '
+            'pub_date REAL)'
+        )
+        connection.execute('CREATE INDEX post_pub_date ON post (pub_date, id)')
+        connection.execute('BEGIN')
+        connection.executemany(
+            'INSERT INTO post (text, pub_date) VALUES (?, ?)',
+            ((f'Пост #{i} ' * 20, i) for i in range(rows))
+        )
+        connection.execute('COMMIT')
+        connection.close()
+
+    def run(self, path, pragmas, readers, seconds):
+        self.result = {
+            'reads': 0, 'writes': 0, 'locked': 0, 'seconds': seconds
+        }
+        self.lock = threading.Lock()
+        deadline = time.monotonic() + seconds
+        threads = [
+            threading.Thread(target=self.read, args=(path, pragmas, deadline))
+            for _ in range(readers)
+        ]
+        threads.append(threading.Thread(
+            target=self.write, args=(path, pragmas, deadline)
+        ))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.result
+
+    def count(self, name, value=1):
+        with self.lock:
+            self.result[name] += value
+
+    def read(self, path, pragmas, deadline):
+        connection = self.connect(path, pragmas)
+        point = 0
+        while time.monotonic() < deadline:
+            point = (point + 997) % self.rows
+            try:
+                connection.execute(FEED_QUERY, (point,)).fetchall()
+                self.count('reads')
+            except sqlite3.OperationalError:
+                self.count('locked')
+        connection.close()
+
+    def write(self, path, pragmas, deadline):
+        connection = self.connect(path, pragmas)
+        while time.monotonic() < deadline:
+            try:
+                connection.execute('BEGIN IMMEDIATE')
+                connection.executemany(
+                    'INSERT INTO post (text, pub_date) VALUES (?, ?)',
+                    (('Новый пост', time.time()),) * BATCH_SIZE
+                )
+                connection.execute('COMMIT')
+                self.count('writes', BATCH_SIZE)
+            except sqlite3.OperationalError:
+                if connection.in_transaction:
+                    connection.execute('ROLLBACK')
+                self.count('locked')
+        connection.close()
@@ -0,0 +1,117 @@
+"""Чтение лент с реплик базы данных.
+
+Виды, обёрнутые в read_from_replica, читают с одной из реплик
+settings.DATABASE_REPLICAS, если запрос безопасный (GET, HEAD) и клиент
+недавно ничего не менял. После изменяющего запроса ReadAfterWrite
+Middleware ставит cookie, и REPLICA_LAG секунд клиент читает с основной
+базы, поэтому автор сразу видит свой пост, комментарий или подписку.
+Запись всегда идёт в основную базу.
+"""
+import random
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+SAFE_METHODS = ('GET', 'HEAD')
+# Сессии и пользователи всегда читаются с основной базы: устаревшая
+# сессия с реплики разлогинила бы пользователя.
+REPLICA_APPS = ('posts',)
+WRITE_COOKIE = 'recent_write'
+
+_state = threading.local()
+
+
+@contextmanager
+def replica_reads(replica=True):
+    """Чтение с реплик внутри блока (replica=False - с основной базы).
+
+    Реплика выбирается один раз на блок, и вложенные блоки читают с
+    неё же: реплики отстают по-разному, и запросы одной страницы не
+    должны видеть разные снимки данных.
+    """
+    previous = getattr(_state, 'replica', None)
+    if replica and settings.DATABASE_REPLICAS:
+        _state.replica = previous or random.choice(
+            settings.DATABASE_REPLICAS
+        )
+    else:
+        _state.replica = None
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+def reading_from_replica():
+    """Читаются ли сейчас посты с реплики."""
+    return getattr(_state, 'replica', None) is not None
+
+
+def read_from_replica(view):
+    """Безопасные запросы вида читают с реплики."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if (
+            request.method not in SAFE_METHODS
+            or WRITE_COOKIE in request.COOKIES
+        ):
+            return view(request, *args, **kwargs)
+        with replica_reads():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Чтение постов - с реплики внутри replica_reads(), остальное -
+    в default.
+
+    Закешированная страница живёт до следующего изменения, поэтому
+    REPLICA_LAG секунд после изменения кеш заполняется по данным
+    основной базы (posts.cache.fresh_reads); отставание реплик должно
+    быть меньше REPLICA_LAG.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            reading_from_replica()
+            and model._meta.app_label in REPLICA_APPS
+        ):
+            return _state.replica
+        return None
+
+    def db_for_write(self, model, **hints):
+        if model._meta.app_label in REPLICA_APPS:
+            _state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReadAfterWriteMiddleware:
+    """Метка недавней записи для чтения своих изменений с основной базы.
+
+    Cookie ставится после изменяющих запросов и после любых других, во
+    время которых роутер выбирал базу для записи постов (подписка и
+    отписка выполняются по GET).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.wrote = False
+        response = self.get_response(request)
+        if request.method not in SAFE_METHODS or _state.wrote:
+            response.set_cookie(
+                WRITE_COOKIE,
+                '1',
+                max_age=settings.REPLICA_LAG,
+                httponly=True
+            )
+        return response
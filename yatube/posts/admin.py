@@ -1,6 +1,8 @@
 from django.contrib import admin
 
+from . import search
 from .models import Post, Group, Comment
+from .paginators import EstimatedCountPaginator
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -15,6 +17,15 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
+    paginator = EstimatedCountPaginator
+    # Без второго COUNT(*) по всей таблице для "N из M".
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по полнотекстовому индексу вместо LIKE."""
+        if not search_term.strip():
+            return queryset, False
+        return search.filter_queryset(queryset, search_term), False
 
 
 admin.site.register(Post, PostAdmin)
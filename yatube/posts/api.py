@@ -0,0 +1,252 @@
+"""JSON-версии лент и страницы поста только для чтения.
+
+Записи выбираются через values() - словарями нужных столбцов, без
+создания экземпляров моделей и отрисовки шаблонов. Страницы
+выбираются по курсору (как в HTML-лентах), а параметром fields можно
+запросить только нужные поля: ?fields=id,text,author.
+"""
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.http import JsonResponse
+from django.views.decorators.http import etag
+
+from core.routers import read_from_replica
+
+from . import timeline
+from .cache import cache_feed
+from .models import Comment, Group, Post
+from .paginators import KeysetPaginator, MergedPaginator
+from .views import (
+    COMMENTS_LIMIT, LIMIT, follow_etag, group_etag, index_etag, post_etag,
+    profile_etag
+)
+
+User = get_user_model()
+
+# Поле ответа -> столбец выборки.
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+TIMELINE_FIELDS = {
+    **{
+        name: f'post__{column}'
+        for name, column in POST_FIELDS.items()
+    },
+    'id': 'post_id',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+GROUP_FIELDS = ('id', 'title', 'slug', 'description')
+AUTHOR_FIELDS = {
+    'id': 'id',
+    'username': 'username',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'posts_count': 'counters__posts_count',
+    'followers_count': 'counters__followers_count',
+    'following_count': 'counters__following_count',
+}
+CONVERTERS = {
+    'image': lambda name: default_storage.url(name) if name else None,
+}
+
+
+class ValuesPaginator(KeysetPaginator):
+    """Пагинация по курсору словарей с выбранными полями."""
+
+    def __init__(self, object_list, per_page, fields, columns,
+                 keys=('-pub_date', '-id')):
+        self.fields = {name: columns[name] for name in fields}
+        selected = set(self.fields.values())
+        selected.update(key.lstrip('-') for key in keys)
+        super().__init__(object_list.values(*selected), per_page, keys)
+
+    def transform(self, rows):
+        return [serialize(row, self.fields) for row in rows]
+
+
+def serialize(row, fields):
+    """Словарь ответа из строки выборки."""
+    data = {}
+    for name, column in fields.items():
+        value = row[column]
+        if name in CONVERTERS:
+            value = CONVERTERS[name](value)
+        data[name] = value
+    return data
+
+
+class UnknownFields(ValueError):
+    """В параметре fields есть поля, которых нет в ответе."""
+
+
+def get_fields(request, columns):
+    """Поля из параметра fields; UnknownFields, если поле неизвестно."""
+    fields = [
+        name.strip()
+        for name in request.GET.get('fields', '').split(',')
+        if name.strip()
+    ]
+    unknown = [name for name in fields if name not in columns]
+    if unknown:
+        raise UnknownFields(f'Неизвестные поля: {", ".join(unknown)}.')
+    return fields or list(columns)
+
+
+def api_response(data, status=200):
+    """Компактный JSON без пробелов и \\u-экранирования."""
+    return JsonResponse(
+        data,
+        status=status,
+        json_dumps_params={'separators': (',', ':'), 'ensure_ascii': False}
+    )
+
+
+def error(message, status):
+    return api_response({'error': message}, status)
+
+
+def api_view(view):
+    """Ответ 400 на неизвестные поля вместо ошибки сервера."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except UnknownFields as exception:
+            return error(str(exception), 400)
+    return wrapper
+
+
+def api_login_required(view):
+    """Ответ 401 гостю вместо перенаправления на форму входа."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return error('Требуется авторизация.', 401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def feed_response(request, posts, columns=POST_FIELDS, **extra):
+    """Страница ленты в JSON."""
+    paginator = ValuesPaginator(
+        posts,
+        LIMIT,
+        get_fields(request, columns),
+        columns,
+        **extra
+    )
+    return page_response(paginator.get_page(request.GET.get('cursor')))
+
+
+def page_response(page_obj):
+    """Записи страницы и курсоры соседних страниц."""
+    return {
+        'results': page_obj.object_list,
+        'next': page_obj.next_cursor,
+        'previous': page_obj.previous_cursor,
+    }
+
+
+@read_from_replica
+@etag(index_etag)
+@cache_feed('posts')
+@api_view
+def index(request):
+    """Главная лента."""
+    return api_response(feed_response(request, Post.objects.all()))
+
+
+@read_from_replica
+@etag(group_etag)
+@api_view
+def group_posts(request, slug):
+    """Лента группы."""
+    group = Group.objects.filter(slug=slug).values(*GROUP_FIELDS).first()
+    if group is None:
+        return error('Группа не найдена.', 404)
+    data = feed_response(request, Post.objects.filter(group_id=group['id']))
+    return api_response({'group': group, **data})
+
+
+@read_from_replica
+@etag(profile_etag)
+@api_view
+def profile(request, username):
+    """Лента автора."""
+    author = User.objects.filter(
+        username=username
+    ).values(*AUTHOR_FIELDS.values()).first()
+    if author is None:
+        return error('Автор не найден.', 404)
+    author = serialize(author, AUTHOR_FIELDS)
+    data = feed_response(request, Post.objects.filter(author_id=author['id']))
+    return api_response({'author': author, **data})
+
+
+@etag(post_etag)
+@api_view
+def post_detail(request, post_id):
+    """Пост и первая (или по курсору) страница комментариев."""
+    fields = {
+        name: POST_FIELDS[name]
+        for name in get_fields(request, POST_FIELDS)
+    }
+    # Без сортировки постов по дате: это выборка по первичному ключу.
+    posts = Post.objects.filter(
+        id=post_id
+    ).order_by().values(*fields.values())[:1]
+    if not posts:
+        return error('Пост не найден.', 404)
+    comments = ValuesPaginator(
+        Comment.objects.filter(post_id=post_id),
+        COMMENTS_LIMIT,
+        COMMENT_FIELDS,
+        COMMENT_FIELDS,
+        keys=('-created', '-id')
+    ).get_page(request.GET.get('cursor'))
+    return api_response({
+        'post': serialize(posts[0], fields),
+        'comments': comments.object_list,
+        'next': comments.next_cursor,
+    })
+
+
+@api_login_required
+@read_from_replica
+@etag(follow_etag)
+@cache_feed('posts', 'follow:{user}')
+@api_view
+def follow_index(request):
+    """Лента подписок: записи ленты и посты популярных авторов."""
+    entries, posts = timeline.get_sources(request.user)
+    fields = get_fields(request, TIMELINE_FIELDS)
+    paginator = ValuesPaginator(
+        entries,
+        LIMIT,
+        fields,
+        TIMELINE_FIELDS,
+        keys=('-pub_date', '-post_id')
+    )
+    if posts is not None:
+        paginator = MergedPaginator([
+            paginator,
+            ValuesPaginator(posts, LIMIT, fields, POST_FIELDS),
+        ], LIMIT)
+    return api_response(page_response(
+        paginator.get_page(request.GET.get('cursor'))
+    ))
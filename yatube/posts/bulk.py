@@ -0,0 +1,84 @@
+"""Массовая запись постов, комментариев и подписок в обход сигналов.
+
+bulk_create не вызывает сигналы моделей, поэтому после загрузки
+счётчики, ленты подписок и поисковый индекс пересчитываются целиком
+(rebuild), а кеш страниц сбрасывается.
+"""
+from contextlib import contextmanager
+from itertools import islice
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from . import counters, search, timeline
+
+BATCH_SIZE = 5000
+
+
+def insert(model, objects, batch_size=BATCH_SIZE):
+    """Вставка объектов из итератора пакетами, по транзакции на пакет.
+
+    Размер одного INSERT bulk_create выбирает по ограничениям базы
+    (SQLite не принимает больше 500 строк в составном SELECT).
+    """
+    objects = iter(objects)
+    count = 0
+    while True:
+        batch = list(islice(objects, batch_size))
+        if not batch:
+            return count
+        with transaction.atomic():
+            model.objects.bulk_create(batch)
+        count += len(batch)
+
+
+def last_id(model):
+    """Наибольший номер записи; новые записи получат номера больше."""
+    return model.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    ).first() or 0
+
+
+@contextmanager
+def keep_dates(model):
+    """Даты из данных вместо auto_now_add на время загрузки."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now_add', False)
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+@contextmanager
+def deferred_indexes(model, defer=True):
+    """Удаление вторичных индексов модели на время загрузки."""
+    if not defer:
+        yield
+        return
+    indexes = model._meta.indexes
+    with connection.schema_editor() as editor:
+        for index in indexes:
+            editor.remove_index(model, index)
+    try:
+        yield
+    finally:
+        with connection.schema_editor() as editor:
+            for index in indexes:
+                editor.add_index(model, index)
+
+
+def rebuild():
+    """Данные, которые обычно поддерживают сигналы моделей."""
+    counters.rebuild()
+    timeline.rebuild()
+    search.get_backend().rebuild()
+    # Загрузка меняет страницы любых авторов, групп и постов: проще
+    # сбросить кеш целиком, чем увеличивать версии каждой из них.
+    # Потерянные версии создаются заново, поэтому меняются и ETag.
+    cache.clear()
@@ -0,0 +1,208 @@
+"""Кеширование страниц с версионными ключами.
+
+В ключ страницы входят версии пространств имён ('posts', 'group:1',
+'post:5', ...), от которых зависит её содержимое. Сигналы моделей
+увеличивают версии, и устаревшие страницы просто перестают читаться,
+поэтому их можно хранить часами. Из тех же версий строится ETag, чтобы
+отвечать 304 повторным посетителям вовсе без обращения к странице.
+
+Пересчёт записи защищён от лавины запросов: её обновляет один процесс
+(блокировка через cache.add), остальные отдают устаревшее значение или
+ждут; горячие записи обновляются досрочно с вероятностью, растущей к
+концу срока (XFetch).
+"""
+import hashlib
+import math
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import quote_etag
+
+from core.routers import reading_from_replica, replica_reads
+
+VERSION_KEY = 'version:{}'
+BUMPED_KEY = 'bumped:{}'
+LOCK_TIMEOUT = 10
+STALE_TIMEOUT = 60 * 5
+POLL_INTERVAL = 0.05
+XFETCH_BETA = 1.0
+
+
+def get_versions(namespaces):
+    """Текущие версии пространств имён одним запросом к кешу."""
+    keys = [VERSION_KEY.format(namespace) for namespace in namespaces]
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump(*namespaces):
+    """Новые версии пространств имён: зависимые страницы устаревают.
+
+    При репликах пространства имён ещё REPLICA_LAG секунд считаются
+    недавно изменёнными (см. fresh_reads).
+    """
+    for namespace in namespaces:
+        key = VERSION_KEY.format(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+    if settings.DATABASE_REPLICAS and namespaces:
+        cache.set_many(
+            {BUMPED_KEY.format(namespace): 1 for namespace in namespaces},
+            settings.REPLICA_LAG
+        )
+
+
+def recently_bumped(namespaces):
+    """Пространства имён, менявшиеся за последние REPLICA_LAG секунд."""
+    keys = {
+        BUMPED_KEY.format(namespace): namespace for namespace in namespaces
+    }
+    return {keys[key] for key in cache.get_many(list(keys))}
+
+
+@contextmanager
+def fresh_reads(namespaces):
+    """Чтение с основной базы, если пространства имён недавно менялись.
+
+    Реплика могла ещё не получить изменение, а посчитанное по ней
+    значение закешировалось бы под новой версией до следующего
+    изменения.
+    """
+    if reading_from_replica() and recently_bumped(namespaces):
+        with replica_reads(False):
+            yield
+    else:
+        yield
+
+
+def make_key(prefix, *parts):
+    """Ключ кеша из произвольных частей."""
+    digest = hashlib.md5(
+        ':'.join(str(part) for part in parts).encode()
+    ).hexdigest()
+    return f'{prefix}:{digest}'
+
+
+def versions_etag(request, *namespaces, csrf=False):
+    """ETag страницы пользователя по версиям её пространств имён.
+
+    csrf=True - для страниц с формой: Django меняет токен CSRF при
+    входе, и страница со старым токеном не должна получать 304.
+    """
+    versions = get_versions(namespaces)
+    if csrf:
+        versions.append(request.META.get('CSRF_COOKIE'))
+    return _etag(request.user.pk, versions)
+
+
+def _etag(user, versions):
+    return make_key('etag', user, *versions)
+
+
+def get_or_set(key, compute, timeout, stale_key=None, cacheable=None):
+    """Значение из кеша или compute(), посчитанное одним процессом.
+
+    Запись живёт в кеше на STALE_TIMEOUT дольше своего срока, чтобы
+    её можно было отдавать, пока другой процесс её пересчитывает.
+    stale_key - ключ последнего значения без учёта версий: его отдают,
+    если запись ещё не посчитана, а блокировка занята.
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        value, delta, expires = entry
+        early = delta * XFETCH_BETA * math.log(1 - random.random())
+        if time.time() - early < expires:
+            return value
+    lock = f'{key}:lock'
+    locked = cache.add(lock, 1, LOCK_TIMEOUT)
+    if not locked:
+        if entry is not None:
+            return entry[0]
+        entry = _wait_for(key, stale_key)
+        if entry is not None:
+            return entry[0]
+    try:
+        start = time.time()
+        value = compute()
+        delta = time.time() - start
+        if cacheable is None or cacheable(value):
+            cache.set(
+                key,
+                (value, delta, time.time() + timeout),
+                timeout + STALE_TIMEOUT
+            )
+            if stale_key:
+                cache.set(stale_key, value, timeout + STALE_TIMEOUT)
+    finally:
+        if locked:
+            cache.delete(lock)
+    return value
+
+
+def _wait_for(key, stale_key):
+    """Запись, которую пересчитывает другой процесс, или прошлая версия."""
+    stale = cache.get(stale_key) if stale_key else None
+    if stale is not None:
+        return stale, 0, 0
+    deadline = time.time() + LOCK_TIMEOUT
+    while time.time() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+    return None
+
+
+def cache_feed(*namespaces):
+    """Кеширование страницы до изменения её пространств имён.
+
+    Пространства имён форматируются аргументами вида и номером
+    пользователя: cache_feed('posts', 'follow:{user}').
+
+    Ответ получает ETag версий, по которым он построен (тот же, что
+    versions_etag с этими пространствами имён), и сохраняет его в кеше:
+    прошлая версия страницы, отданная во время пересчёта, не выдаётся
+    за текущую, и повторный запрос с её ETag получит новую страницу.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            user = request.user.pk
+            names = [
+                namespace.format(user=user, **kwargs)
+                for namespace in namespaces
+            ]
+            versions = get_versions(names)
+            path = request.get_full_path()
+
+            def compute():
+                with fresh_reads(names):
+                    response = view(request, *args, **kwargs)
+                response.setdefault(
+                    'ETag', quote_etag(_etag(user, versions))
+                )
+                return response
+
+            return get_or_set(
+                make_key('feed', path, user, *versions),
+                compute,
+                settings.FEED_CACHE_TIMEOUT,
+                stale_key=make_key('feed', path, user),
+                cacheable=lambda response: (
+                    response.status_code == 200 and not response.streaming
+                )
+            )
+        return wrapper
+    return decorator
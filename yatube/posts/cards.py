@@ -0,0 +1,84 @@
+"""Карточки постов в лентах с кешированием готового HTML.
+
+Карточка хранится в кеше до изменения поста (пространство имён
+'post:<id>'), имени автора, адреса группы или готовности миниатюр его
+картинки ('image:<имя>'), поэтому лента собирается из кеша, а шаблон
+рендерится только для новых и отредактированных постов. Страница ленты
+обходится двумя запросами к кешу: версии и карточки читаются через
+get_many, промахи дописываются одним set_many. Карточки с заглушкой
+вместо миниатюр не кешируются.
+"""
+from django.conf import settings
+from django.core.cache import cache as django_cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core.routers import reading_from_replica
+
+from . import cache, thumbnails
+
+TEMPLATE = 'posts/includes/post_card.html'
+
+
+def namespaces(post):
+    """Пространства имён, от которых зависит карточка.
+
+    Кроме поста, карточка выводит имя автора и адрес группы: их
+    изменения сбрасывают 'user:<id>' и 'group-info:<id>'. Пространство
+    'group:<id>' не подходит - оно меняется с каждым постом группы.
+    """
+    names = [f'post:{post.pk}', f'user:{post.author_id}']
+    if post.group_id is not None:
+        names.append(f'group-info:{post.group_id}')
+    if post.image:
+        names.append(f'image:{post.image.name}')
+    return names
+
+
+def render_many(posts, aspect, show_group=True):
+    """HTML карточек постов в их порядке: из кеша, промахи - заново."""
+    posts = list(posts)
+    names = [namespaces(post) for post in posts]
+    versions = iter(cache.get_versions(
+        [name for post_names in names for name in post_names]
+    ))
+    keys = [
+        cache.make_key(
+            'post_card',
+            post.pk,
+            aspect,
+            show_group,
+            *[next(versions) for _ in post_names]
+        )
+        for post, post_names in zip(posts, names)
+    ]
+    found = django_cache.get_many(keys)
+    missing = {}
+    for post, key in zip(posts, keys):
+        if key not in found:
+            html = render_to_string(TEMPLATE, {
+                'post': post,
+                'aspect': aspect,
+                'show_group': show_group,
+            })
+            if post.image and not thumbnails.is_ready(post.image):
+                # Карточка с заглушкой не кешируется: следующий показ
+                # снова проверит миниатюры и перезапустит сбойное задание.
+                found[key] = html
+            else:
+                missing[key] = html
+    if missing and reading_from_replica():
+        # Пост с реплики мог ещё не получить недавнее изменение, а его
+        # карточка закешировалась бы под новой версией.
+        lagging = cache.recently_bumped([
+            name
+            for post_names, key in zip(names, keys) if key in missing
+            for name in post_names
+        ])
+        for post_names, key in zip(names, keys):
+            if key in missing and lagging.intersection(post_names):
+                found[key] = missing.pop(key)
+    if missing:
+        django_cache.set_many(missing, settings.FEED_CACHE_TIMEOUT)
+        found.update(missing)
+    return [mark_safe(found[key]) for key in keys]
@@ -0,0 +1,67 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются сигналами атомарно, через F()-выражения, поэтому при
+выводе страниц их не нужно считать запросами COUNT.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, UserCounters
+
+User = get_user_model()
+
+
+def increment(user_id, **deltas):
+    """Изменение счётчиков пользователя на deltas.
+
+    Строка счётчиков создаётся только при увеличении: уменьшение
+    без строки бывает, когда пользователь удаляется вместе с ней.
+    """
+    values = {name: F(name) + delta for name, delta in deltas.items()}
+    if UserCounters.objects.filter(user_id=user_id).update(**values):
+        return
+    if all(delta > 0 for delta in deltas.values()):
+        UserCounters.objects.get_or_create(user_id=user_id)
+        UserCounters.objects.filter(user_id=user_id).update(**values)
+
+
+def increment_comments(post_id, delta):
+    """Изменение счётчика комментариев поста."""
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def count_of(model, field, outer='pk'):
+    """Подзапрос с числом строк model, ссылающихся на внешнюю запись."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field: OuterRef(outer)}
+            ).order_by().values(field).annotate(
+                count=Count('pk')
+            ).values('count')
+        ),
+        0
+    )
+
+
+@transaction.atomic
+def rebuild():
+    """Пересчёт всех счётчиков по данным таблиц."""
+    UserCounters.objects.bulk_create(
+        (
+            UserCounters(user_id=user_id)
+            for user_id in User.objects.values_list('pk', flat=True)
+        ),
+        batch_size=500,
+        ignore_conflicts=True
+    )
+    UserCounters.objects.update(
+        posts_count=count_of(Post, 'author', 'user'),
+        followers_count=count_of(Follow, 'author', 'user'),
+        following_count=count_of(Follow, 'user', 'user'),
+    )
+    Post.objects.update(comments_count=count_of(Comment, 'post'))
@@ -0,0 +1,187 @@
+import json
+import statistics
+import subprocess
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.management.commands.serve_benchmark import percentile
+from posts.models import Group, Post
+from posts.urls import app_name, urlpatterns
+
+User = get_user_model()
+
+# Виды, меняющие данные при GET: их время зависит от числа повторов.
+MUTATING = ('profile_follow', 'profile_unfollow')
+
+
+def git_revision():
+    """Текущий коммит или None вне репозитория."""
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def summary(timings, queries):
+    """Перцентили времени в миллисекундах и медиана числа запросов."""
+    # statistics.quantiles появился только в Python 3.8.
+    timings = [timing * 1000 for timing in timings]
+    return {
+        'p50': round(percentile(timings, 50), 2),
+        'p95': round(percentile(timings, 95), 2),
+        'p99': round(percentile(timings, 99), 2),
+        'mean': round(statistics.mean(timings), 2),
+        'queries': statistics.median(queries),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Измеряет время ответа всех адресов posts/urls.py на текущих '
+        'данных (см. generate_data): p50/p95/p99 и число SQL-запросов. '
+        'Результаты сохраняются в JSON для сравнения коммитов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Очищать кеш перед каждым запросом.'
+        )
+        parser.add_argument(
+            '--user',
+            help='Пользователь для страниц, требующих входа '
+                 '(по умолчанию - с наибольшим числом подписок).'
+        )
+        parser.add_argument('--output', help='Файл для результатов в JSON.')
+        parser.add_argument(
+            '--compare',
+            help='JSON прошлого запуска: вывести изменение p50 и p95.'
+        )
+
+    def handle(self, *args, **options):
+        client = Client()
+        client.force_login(self.get_user(options['user']))
+        results = {}
+        for name, url, params in self.urls():
+            results[name] = self.measure(client, url, params, options)
+            self.print_result(name, results[name])
+        report = {
+            'revision': git_revision(),
+            'date': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'posts': Post.objects.count(),
+            'options': {
+                name: options[name]
+                for name in ('iterations', 'warmup', 'cold')
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def get_user(self, username):
+        if username:
+            user = User.objects.filter(username=username).first()
+        else:
+            user = User.objects.order_by(
+                '-counters__following_count', 'pk'
+            ).first()
+        if user is None:
+            raise CommandError(
+                'Нет пользователей: сначала выполните generate_data.'
+            )
+        return user
+
+    def samples(self):
+        """Значения параметров адресов: самые нагруженные записи."""
+        group = Group.objects.annotate(
+            posts_count=Count('posts')
+        ).order_by('-posts_count').first()
+        author = User.objects.order_by('-counters__posts_count', 'pk').first()
+        post = Post.objects.order_by('-comments_count', 'pk').first()
+        if post is None:
+            raise CommandError('Нет постов: сначала выполните generate_data.')
+        return {
+            'slug': group.slug if group else 'none',
+            'username': author.username,
+            'post_id': post.pk,
+        }, post.text.split()[0].strip('.')
+
+    def urls(self):
+        """Имя, адрес и параметры запроса для каждого адреса posts."""
+        values, word = self.samples()
+        for pattern in urlpatterns:
+            if pattern.name in MUTATING:
+                self.stdout.write(f'{pattern.name}: пропущен (меняет данные)')
+                continue
+            kwargs = {
+                name: values[name] for name in pattern.pattern.converters
+            }
+            params = {'q': word} if pattern.name == 'search' else {}
+            yield (
+                pattern.name,
+                reverse(f'{app_name}:{pattern.name}', kwargs=kwargs),
+                params
+            )
+
+    def measure(self, client, url, params, options):
+        for _ in range(options['warmup']):
+            client.get(url, params)
+        timings, queries = [], []
+        for _ in range(options['iterations']):
+            if options['cold']:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = client.get(url, params)
+                timings.append(time.perf_counter() - start)
+            queries.append(len(captured))
+        return {
+            'url': url,
+            'status': response.status_code,
+            **summary(timings, queries),
+        }
+
+    def print_result(self, name, result):
+        self.stdout.write(
+            f'{name:18} {result["status"]} '
+            f'p50 {result["p50"]:7.2f} мс  p95 {result["p95"]:7.2f} мс  '
+            f'p99 {result["p99"]:7.2f} мс  запросов {result["queries"]:g}'
+        )
+
+    def compare(self, path, results):
+        with open(path) as file:
+            previous = json.load(file)
+        self.stdout.write(f'Сравнение с {previous.get("revision") or path}:')
+        for name, result in results.items():
+            old = previous['results'].get(name)
+            if not old:
+                continue
+            self.stdout.write(
+                f'{name:18} p50 x{result["p50"] / max(old["p50"], 1e-6):.2f}'
+                f'  p95 x{result["p95"] / max(old["p95"], 1e-6):.2f}'
+                f'  запросов {old["queries"]:g} -> {result["queries"]:g}'
+            )
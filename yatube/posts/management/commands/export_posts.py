@@ -0,0 +1,153 @@
+import csv
+import gzip
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import Comment, Follow, Post
+
+# Выгружаемые столбцы: внешние ключи - номерами, без JOIN.
+MODELS = {
+    'post': (
+        Post,
+        ('id', 'text', 'pub_date', 'author_id', 'group_id', 'image',
+         'comments_count')
+    ),
+    'comment': (
+        Comment,
+        ('id', 'post_id', 'author_id', 'text', 'created')
+    ),
+    'follow': (
+        Follow,
+        ('id', 'user_id', 'author_id')
+    ),
+}
+FORMATS = ('ndjson', 'csv')
+CHUNK_SIZE = 2000
+
+
+def to_text(value):
+    # Время - с микросекундами и часовым поясом.
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+class TrackedRows:
+    """Итератор строк, запоминающий их число и последний номер.
+
+    Строка считается выгруженной, когда запрошена следующая: к этому
+    моменту она уже записана в файл.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.count = 0
+        self.last_id = None
+
+    def __iter__(self):
+        for row in self.rows:
+            yield row
+            self.count += 1
+            self.last_id = row[0]
+
+
+def export_rows(rows, fields, file, file_format, header):
+    """Запись строк в файл по одной."""
+    if file_format == 'csv':
+        writer = csv.writer(file)
+        if header:
+            writer.writerow(fields)
+        for row in rows:
+            writer.writerow([to_text(value) for value in row])
+        return
+    for row in rows:
+        file.write(json.dumps(
+            dict(zip(fields, row)),
+            default=to_text,
+            ensure_ascii=False,
+            separators=(',', ':')
+        ) + '\n')
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает посты, комментарии и подписки в NDJSON или '
+        'CSV (по файлу на модель), при необходимости сжимая gzip. '
+        'Память не зависит от размера таблиц; прерванную выгрузку можно '
+        'продолжить с --after-id.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--model',
+            action='append',
+            choices=list(MODELS),
+            help='Модель для выгрузки (можно несколько; по умолчанию все).'
+        )
+        parser.add_argument('--format', choices=FORMATS, default='ndjson')
+        parser.add_argument(
+            '--output',
+            default='.',
+            help='Каталог для файлов <модель>.<формат>[.gz].'
+        )
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=CHUNK_SIZE,
+            help='Строк, читаемых из базы за раз.'
+        )
+        parser.add_argument(
+            '--after-id',
+            type=int,
+            help=(
+                'Продолжить выгрузку одной модели после записи с этим '
+                'номером, дописывая файл.'
+            )
+        )
+
+    def handle(self, *args, **options):
+        names = options['model'] or list(MODELS)
+        if options['after_id'] is not None and len(names) != 1:
+            raise CommandError('--after-id задаётся для одной модели.')
+        os.makedirs(options['output'], exist_ok=True)
+        for name in names:
+            self.export(name, options)
+
+    def export(self, name, options):
+        model, fields = MODELS[name]
+        after_id = options['after_id']
+        path = os.path.join(
+            options['output'],
+            f"{name}.{options['format']}" + ('.gz' if options['gzip'] else '')
+        )
+        rows = model.objects.order_by('id').values_list(*fields)
+        append = after_id is not None
+        if append:
+            rows = rows.filter(id__gt=after_id)
+        header = not (append and os.path.exists(path))
+        opener = gzip.open if options['gzip'] else open
+        start = time.perf_counter()
+        # Дописывание в .gz добавляет новый поток gzip: gunzip и
+        # gzip.open читают такой файл целиком.
+        with opener(
+            path, 'at' if append else 'wt', encoding='utf-8', newline=''
+        ) as file:
+            rows = TrackedRows(rows.iterator(options['chunk_size']))
+            try:
+                export_rows(rows, fields, file, options['format'], header)
+            except KeyboardInterrupt:
+                self.stderr.write(
+                    f'{name}: прервано, продолжить с --model {name} '
+                    f'--after-id {rows.last_id or after_id or 0}'
+                )
+                raise
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'{name}: {rows.count} строк за {elapsed:.1f} с '
+            f'({rows.count / max(elapsed, 1e-6):.0f} строк/с), '
+            f'последний id {rows.last_id or after_id} -> {path}'
+        )
@@ -0,0 +1,227 @@
+import random
+import time
+from datetime import timedelta
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from PIL import Image
+
+from posts import bulk
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+WORDS = (
+    'город', 'утро', 'кофе', 'книга', 'поезд', 'море', 'музыка', 'кино',
+    'работа', 'отпуск', 'друзья', 'погода', 'дождь', 'солнце', 'лес',
+    'новости', 'спорт', 'проект', 'питон', 'джанго', 'база', 'данные',
+    'кеш', 'лента', 'подписка', 'пост', 'вечер', 'выходные', 'дорога',
+    'фото',
+)
+COLORS = ('red', 'green', 'blue', 'orange', 'purple', 'gray')
+
+
+def power_law_weights(count, alpha):
+    """Накопленные веса рангов 1..count с распределением Ципфа."""
+    return list(accumulate(1 / rank ** alpha for rank in range(1, count + 1)))
+
+
+def text(rng, words):
+    return ' '.join(rng.choices(WORDS, k=words)).capitalize() + '.'
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт синтетические данные заданного объёма через bulk_create: '
+        'пользователей, группы, посты (число постов автора распределено '
+        'по степенному закону), подписки, комментарии и картинки. '
+        'Пароль всех пользователей - --password.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument(
+            '--follows',
+            type=int,
+            default=20,
+            help='Среднее число подписок пользователя.'
+        )
+        parser.add_argument(
+            '--images',
+            type=float,
+            default=0.1,
+            help='Доля постов с картинкой.'
+        )
+        parser.add_argument(
+            '--alpha',
+            type=float,
+            default=1.1,
+            help='Показатель степенного закона для авторов и подписок.'
+        )
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--password', default='password')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size', type=int, default=bulk.BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        start = time.perf_counter()
+        users = self.step('users', self.create_users, options)
+        groups = self.step('groups', self.create_groups, options)
+        self.weights = power_law_weights(len(users), options['alpha'])
+        posts = self.step('posts', self.create_posts, options, users, groups)
+        self.step('follows', self.create_follows, options, users)
+        self.step('comments', self.create_comments, options, users, posts)
+        self.step('rebuild', lambda options: bulk.rebuild(), options)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.perf_counter() - start:.1f} с.'
+        ))
+
+    def step(self, name, create, options, *args):
+        start = time.perf_counter()
+        result = create(options, *args)
+        count = f'{len(result)} ' if result is not None else ''
+        self.stdout.write(
+            f'{name}: {count}за {time.perf_counter() - start:.1f} с'
+        )
+        return result
+
+    def new_ids(self, model, objects):
+        """Вставка объектов и номера созданных записей."""
+        after = bulk.last_id(model)
+        bulk.insert(model, objects, self.batch_size)
+        return list(
+            model.objects.filter(pk__gt=after).order_by('pk').values_list(
+                'pk', flat=True
+            )
+        )
+
+    def ranking(self, users):
+        """Пользователи в случайном порядке: место - ранг популярности."""
+        users = list(users)
+        self.rng.shuffle(users)
+        return users
+
+    def pick(self, ranking, count):
+        """count пользователей по степенному закону от ранга."""
+        return self.rng.choices(ranking, cum_weights=self.weights, k=count)
+
+    def create_users(self, options):
+        prefix = f'user{bulk.last_id(User)}_'
+        password = make_password(options['password'])
+        return self.new_ids(User, (
+            User(username=f'{prefix}{i}', password=password)
+            for i in range(options['users'])
+        ))
+
+    def create_groups(self, options):
+        prefix = f'group{bulk.last_id(Group)}-'
+        return self.new_ids(Group, (
+            Group(
+                title=text(self.rng, 2),
+                slug=f'{prefix}{i}',
+                description=text(self.rng, 12)
+            )
+            for i in range(options['groups'])
+        ))
+
+    def create_images(self):
+        names = []
+        for color in COLORS:
+            buffer = BytesIO()
+            Image.new('RGB', (1920, 1080), color).save(buffer, 'JPEG')
+            names.append(default_storage.save(
+                f'posts/generated-{color}.jpg', ContentFile(buffer.getvalue())
+            ))
+        return names
+
+    def create_posts(self, options, users, groups):
+        images = self.create_images() if options['images'] else []
+        now = timezone.now()
+        # Даты по возрастанию: номера постов идут в порядке публикации.
+        offsets = sorted(
+            (
+                self.rng.random() * options['days'] * 86400
+                for _ in range(options['posts'])
+            ),
+            reverse=True
+        )
+        authors = self.pick(self.ranking(users), options['posts'])
+
+        def posts():
+            for offset, author_id in zip(offsets, authors):
+                yield Post(
+                    text=text(self.rng, self.rng.randint(5, 60)),
+                    pub_date=now - timedelta(seconds=offset),
+                    author_id=author_id,
+                    group_id=(
+                        self.rng.choice(groups)
+                        if groups and self.rng.random() < 0.5 else None
+                    ),
+                    image=(
+                        self.rng.choice(images)
+                        if images and self.rng.random() < options['images']
+                        else ''
+                    )
+                )
+
+        with bulk.keep_dates(Post):
+            return self.new_ids(Post, posts())
+
+    def create_follows(self, options, users):
+        """Подписки на авторов: популярных выбирают чаще.
+
+        Популярность у подписчиков не связана с числом постов, иначе
+        объём лент подписок (подписчики x посты) растёт квадратично.
+        """
+        ranking = self.ranking(users)
+
+        def follows():
+            for user_id in users:
+                count = min(
+                    int(self.rng.expovariate(1 / options['follows'])),
+                    len(users) - 1
+                )
+                authors = set()
+                # Попытки ограничены: при сильной концентрации весов
+                # набрать много разных авторов трудно.
+                for author_id in self.pick(ranking, count * 3):
+                    if len(authors) == count:
+                        break
+                    if author_id != user_id:
+                        authors.add(author_id)
+                for author_id in authors:
+                    yield Follow(user_id=user_id, author_id=author_id)
+
+        bulk.insert(Follow, follows(), self.batch_size)
+
+    def create_comments(self, options, users, posts):
+        if not posts:
+            return None
+        now = timezone.now()
+
+        def comments():
+            for _ in range(options['comments']):
+                yield Comment(
+                    post_id=self.rng.choice(posts),
+                    author_id=self.rng.choice(users),
+                    text=text(self.rng, self.rng.randint(3, 25)),
+                    created=now - timedelta(
+                        seconds=self.rng.random() * options['days'] * 86400
+                    )
+                )
+
+        with bulk.keep_dates(Comment):
+            bulk.insert(Comment, comments(), self.batch_size)
@@ -0,0 +1,284 @@
+import csv
+import gzip
+import json
+import os
+import time
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils import timezone
+
+from posts import bulk
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Модели в порядке загрузки: комментарии ссылаются на посты.
+MODELS = {
+    'post': Post,
+    'comment': Comment,
+    'follow': Follow,
+}
+# Столбцы модели, которые берутся из файла как есть.
+COLUMNS = {
+    'post': ('id', 'text', 'pub_date', 'author_id', 'group_id', 'image'),
+    'comment': ('id', 'post_id', 'author_id', 'text', 'created'),
+    'follow': ('id', 'user_id', 'author_id'),
+}
+# Ссылки по имени: поле файла -> (столбец, справочник).
+REFERENCES = {
+    'post': {'author': ('author_id', 'user'), 'group': ('group_id', 'group')},
+    'comment': {'author': ('author_id', 'user')},
+    'follow': {
+        'user': ('user_id', 'user'),
+        'author': ('author_id', 'user'),
+    },
+}
+# Дата создания: без неё в файле ставится время загрузки.
+DATES = {
+    'post': 'pub_date',
+    'comment': 'created',
+}
+
+
+def read_rows(path):
+    """Словари строк NDJSON или CSV (в том числе .gz) по одной."""
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8', newline='') as file:
+        if '.csv' in os.path.basename(path):
+            # Пустое значение CSV - это NULL.
+            for row in csv.DictReader(file):
+                yield {name: value or None for name, value in row.items()}
+            return
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def model_name(path):
+    """Модель по имени файла: post.ndjson.gz -> 'post'."""
+    name = os.path.basename(path).split('.', 1)[0]
+    if name not in MODELS:
+        raise CommandError(
+            f'Не удалось определить модель по имени файла {path}: '
+            f'ожидается {", ".join(f"{name}.*" for name in MODELS)}.'
+        )
+    return name
+
+
+class Lookup:
+    """Номера пользователей или групп по имени, загруженные один раз."""
+
+    def __init__(self, model, key, create=False):
+        self.model = model
+        self.key = key
+        self.create = create
+        self.ids = dict(model.objects.values_list(key, 'pk').iterator())
+
+    def resolve(self, names):
+        """Подгрузка недостающих имён (с созданием, если разрешено)."""
+        missing = {name for name in names if name not in self.ids}
+        if not missing or not self.create:
+            return
+        self.model.objects.bulk_create(
+            [self.build(name) for name in missing],
+            ignore_conflicts=True
+        )
+        self.ids.update(
+            self.model.objects.filter(
+                **{f'{self.key}__in': missing}
+            ).values_list(self.key, 'pk')
+        )
+
+    def build(self, name):
+        if self.model is Group:
+            return Group(title=name, slug=name, description='')
+        user = User(username=name)
+        user.set_unusable_password()
+        return user
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты, комментарии и подписки из NDJSON или CSV '
+        '(в том числе .gz, формат export_posts) пакетами через '
+        'bulk_create и пересчитывает счётчики, ленты и поисковый индекс. '
+        'Авторы и группы указываются номерами (author_id, group_id) '
+        'или именами (author, group, user).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files',
+            nargs='+',
+            help='Файлы <модель>.<формат>[.gz], например post.ndjson.gz.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=bulk.BATCH_SIZE
+        )
+        parser.add_argument(
+            '--create-missing',
+            action='store_true',
+            help='Создавать пользователей и группы, которых нет в базе.'
+        )
+        parser.add_argument(
+            '--ignore-conflicts',
+            action='store_true',
+            help='Пропускать строки с уже занятыми номерами.'
+        )
+        parser.add_argument(
+            '--defer-indexes',
+            action='store_true',
+            help='Удалить индексы на время загрузки и создать заново.'
+        )
+        parser.add_argument(
+            '--skip-rebuild',
+            action='store_true',
+            help='Не пересчитывать счётчики, ленты и поисковый индекс.'
+        )
+
+    def handle(self, *args, **options):
+        files = sorted(
+            ((model_name(path), path) for path in options['files']),
+            key=lambda item: list(MODELS).index(item[0])
+        )
+        for _, path in files:
+            if not os.path.exists(path):
+                raise CommandError(f'Файл {path} не найден.')
+        self.lookups = {
+            'user': Lookup(User, 'username', options['create_missing']),
+            'group': Lookup(Group, 'slug', options['create_missing']),
+        }
+        start = time.perf_counter()
+        try:
+            total = sum(
+                self.load(name, path, options) for name, path in files
+            )
+        finally:
+            # Пакеты сохраняются по одному: после ошибки загруженная часть
+            # остаётся в базе, и для неё тоже нужны счётчики и ленты.
+            if not options['skip_rebuild']:
+                bulk.rebuild()
+        self.report('Всего', total, 0, time.perf_counter() - start)
+
+    def load(self, name, path, options):
+        """Загрузка одного файла; число добавленных строк."""
+        model = MODELS[name]
+        rows = read_rows(path)
+        loaded = skipped = 0
+        start = time.perf_counter()
+        with bulk.keep_dates(model), bulk.deferred_indexes(
+            model, options['defer_indexes']
+        ):
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                objects = self.build(name, batch)
+                skipped += len(batch) - len(objects)
+                # Размер одного INSERT bulk_create выбирает по ограничениям
+                # базы; batch_size задаёт размер транзакции.
+                with transaction.atomic():
+                    model.objects.bulk_create(
+                        objects,
+                        ignore_conflicts=options['ignore_conflicts']
+                    )
+                loaded += len(objects)
+                if options['verbosity'] > 1:
+                    self.report(name, loaded, skipped,
+                                time.perf_counter() - start)
+        self.reset_sequence(model)
+        self.report(path, loaded, skipped, time.perf_counter() - start)
+        return loaded
+
+    def build(self, name, batch):
+        """Объекты модели из строк пакета; строки с неизвестными
+        ссылками пропускаются."""
+        references = REFERENCES[name]
+        for field, (_, lookup) in references.items():
+            self.lookups[lookup].resolve(
+                {row[field] for row in batch if row.get(field)}
+            )
+        now = timezone.now()
+        rows = []
+        for row in batch:
+            values = self.values(name, row)
+            if values is None:
+                continue
+            if name in DATES:
+                values.setdefault(DATES[name], now)
+            rows.append(values)
+        model = MODELS[name]
+        return [model(**values) for values in self.existing(model, rows)]
+
+    def values(self, name, row):
+        """Значения столбцов строки с номерами вместо имён или None,
+        если имени нет в базе."""
+        values = {
+            column: row[column]
+            for column in COLUMNS[name]
+            if row.get(column) is not None
+        }
+        for field, (column, lookup) in REFERENCES[name].items():
+            if row.get(field):
+                pk = self.lookups[lookup].ids.get(row[field])
+                if pk is None:
+                    return None
+                values[column] = pk
+        return values
+
+    def existing(self, model, rows):
+        """Строки, все внешние ключи которых указывают на записи в базе.
+
+        Обязательный ключ должен быть задан; номера проверяются одним
+        запросом на ключ для всего пакета.
+        """
+        for field in model._meta.concrete_fields:
+            if not field.is_relation:
+                continue
+            column = field.attname
+            checked = []
+            for values in rows:
+                if values.get(column) is None:
+                    if field.null:
+                        checked.append(values)
+                    continue
+                try:
+                    values[column] = field.to_python(values[column])
+                except ValidationError:
+                    continue
+                checked.append(values)
+            ids = {
+                values[column] for values in checked
+                if values.get(column) is not None
+            }
+            known = set(
+                field.related_model._default_manager.filter(
+                    pk__in=ids
+                ).values_list('pk', flat=True)
+            ) if ids else set()
+            rows = [
+                values for values in checked
+                if values.get(column) is None or values[column] in known
+            ]
+        return rows
+
+    def reset_sequence(self, model):
+        """Счётчик первичного ключа после вставки явных номеров."""
+        statements = connection.ops.sequence_reset_sql(no_style(), [model])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+    def report(self, label, loaded, skipped, elapsed):
+        message = (
+            f'{label}: {loaded} строк за {elapsed:.1f} с '
+            f'({loaded / max(elapsed, 1e-6):.0f} строк/с)'
+        )
+        if skipped:
+            message += f', пропущено {skipped}'
+        self.stdout.write(message)
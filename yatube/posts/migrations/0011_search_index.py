@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:14
+
+from django.db import migrations
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        'CREATE VIRTUAL TABLE posts_search USING fts5('
+        'text, tokenize="unicode61 remove_diacritics 2")'
+    )
+    # rowid = id * 3 + вид записи (пост 0, комментарий 1, группа 2).
+    schema_editor.execute(
+        'INSERT INTO posts_search (rowid, text) '
+        'SELECT id * 3, text FROM posts_post'
+    )
+    schema_editor.execute(
+        'INSERT INTO posts_search (rowid, text) '
+        'SELECT id * 3 + 1, text FROM posts_comment'
+    )
+    schema_editor.execute(
+        'INSERT INTO posts_search (rowid, text) '
+        'SELECT id * 3 + 2, title FROM posts_group'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
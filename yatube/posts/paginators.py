@@ -0,0 +1,256 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from . import cache
+
+NEXT = 'n'
+PREVIOUS = 'p'
+# Начиная с этого числа строк таблицы точный COUNT(*) заменяется оценкой.
+ESTIMATE_THRESHOLD = 10000
+COUNT_TIMEOUT = 60 * 60
+COUNT_NAMESPACE = 'count:{}'
+
+
+def _serialize(value):
+    # Время - с микросекундами, иначе соседние записи сольются.
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(payload):
+    """Непрозрачная строка курсора из JSON-совместимых данных."""
+    data = json.dumps(payload, default=_serialize, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Данные курсора; ValueError, если курсор повреждён."""
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+    except binascii.Error as error:
+        raise ValueError(error)
+    return json.loads(data.decode())
+
+
+def estimate_count(model):
+    """Число строк таблицы по статистике базы или None, если её нет."""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # sqlite_stat1 создаётся командой ANALYZE; первое число
+            # в stat - строки таблицы.
+            cursor.execute(
+                'SELECT 1 FROM sqlite_master WHERE name = %s',
+                ['sqlite_stat1']
+            )
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table]
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                return None
+            return max(int(stat.split()[0]) for stat, in rows)
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                [table]
+            )
+            row = cursor.fetchone()
+            return row[0] if row and row[0] >= 0 else None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, не выполняющий COUNT(*) на каждый запрос.
+
+    Размер большой таблицы без условий оценивается по статистике базы
+    (estimated = True), остальные выборки считаются точно и кешируются
+    по тексту запроса до изменения таблицы: сигналы увеличивают версию
+    пространства имён 'count:<модель>'.
+    """
+    estimated = False
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return super().count
+        namespace = COUNT_NAMESPACE.format(queryset.model._meta.label_lower)
+        count, self.estimated = cache.get_or_set(
+            cache.make_key(
+                'count',
+                queryset.query,
+                *cache.get_versions([namespace])
+            ),
+            self._count,
+            COUNT_TIMEOUT
+        )
+        return count
+
+    def _count(self):
+        """Размер выборки и признак того, что он оценочный."""
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimate_count(queryset.model)
+            if estimate is not None and estimate > ESTIMATE_THRESHOLD:
+                return estimate, True
+        namespace = COUNT_NAMESPACE.format(queryset.model._meta.label_lower)
+        with cache.fresh_reads([namespace]):
+            return queryset.count(), False
+
+
+class KeysetPaginator(EstimatedCountPaginator):
+    """Пагинация по ключу сортировки вместо OFFSET.
+
+    Страница выбирается условием на ключ (по умолчанию pub_date, id)
+    последней или первой записи соседней страницы, поэтому любая
+    страница стоит столько же, сколько первая. Курсоры передаются
+    клиенту в виде непрозрачных строк.
+    """
+
+    def __init__(self, object_list, per_page, keys=('-pub_date', '-id')):
+        self.keys = tuple(keys)
+        super().__init__(object_list.order_by(*self.keys), per_page)
+
+    def get_page(self, cursor):
+        """Страница по курсору; без курсора или с битым - первая."""
+        try:
+            number, direction, values = self.decode(cursor)
+        except (TypeError, ValueError, ValidationError):
+            number, direction, values = 1, NEXT, None
+        rows = self.fetch(values, direction)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == PREVIOUS:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, values is not None
+        if not has_previous:
+            number = 1
+        page = self._get_page(self.transform(rows), number, self)
+        page.next_cursor = page.previous_cursor = None
+        if has_next and rows:
+            page.next_cursor = self.encode(number + 1, NEXT, rows[-1])
+        if has_previous and rows:
+            page.previous_cursor = self.encode(number - 1, PREVIOUS, rows[0])
+        return page
+
+    def fetch(self, values, direction):
+        """Не больше per_page + 1 строк после (или до) ключа values
+        в порядке обхода."""
+        rows = self.object_list
+        if values is not None:
+            rows = rows.filter(self._seek(values, direction))
+        if direction == PREVIOUS:
+            rows = rows.reverse()
+        return list(rows[:self.per_page + 1])
+
+    def transform(self, rows):
+        """Преобразование строк страницы перед выдачей в шаблон."""
+        return rows
+
+    def key(self, row):
+        """Значения ключа сортировки строки."""
+        return [self._value(row, name) for name in self._names()]
+
+    def encode(self, number, direction, row):
+        """Курсор на страницу number относительно записи row."""
+        return encode_cursor([number, direction, self.key(row)])
+
+    def decode(self, cursor):
+        """Номер страницы, направление и значения ключа из курсора."""
+        if not cursor:
+            return 1, NEXT, None
+        number, direction, values = decode_cursor(cursor)
+        names = self._names()
+        if (
+            not isinstance(number, int)
+            or number < 1
+            or direction not in (NEXT, PREVIOUS)
+            or len(values) != len(names)
+        ):
+            raise ValueError('Некорректный курсор.')
+        opts = self.object_list.model._meta
+        values = [
+            opts.get_field(name).to_python(value)
+            for name, value in zip(names, values)
+        ]
+        return number, direction, values
+
+    def _names(self):
+        return [key.lstrip('-') for key in self.keys]
+
+    @staticmethod
+    def _value(row, name):
+        if isinstance(row, dict):
+            return row[name]
+        return getattr(row, name)
+
+    def _seek(self, values, direction):
+        """Условие "строго после" (или "до") записи с ключом values."""
+        condition = Q()
+        equal = {}
+        for key, value in zip(self.keys, values):
+            name = key.lstrip('-')
+            descending = key.startswith('-')
+            lookup = 'lt' if descending == (direction == NEXT) else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        return condition
+
+
+class MergedPaginator(KeysetPaginator):
+    """Пагинация по курсору нескольких выборок с общим ключом.
+
+    Каждая выборка задаётся своим KeysetPaginator (столбцы ключа могут
+    называться по-разному, но значения сравнимы, и порядок одинаков).
+    Для страницы из каждой берётся per_page + 1 строк после курсора по
+    её индексу, и строки сливаются по значению ключа. Выборки не должны
+    пересекаться.
+    """
+
+    def __init__(self, paginators, per_page):
+        self.paginators = paginators
+        first = paginators[0]
+        super().__init__(first.object_list, per_page, first.keys)
+
+    @cached_property
+    def count(self):
+        count = sum(paginator.count for paginator in self.paginators)
+        self.estimated = any(
+            paginator.estimated for paginator in self.paginators
+        )
+        return count
+
+    def fetch(self, values, direction):
+        rows = []
+        for paginator in self.paginators:
+            fetched = paginator.fetch(values, direction)
+            rows.extend(zip(
+                (paginator.key(row) for row in fetched),
+                paginator.transform(fetched)
+            ))
+        descending = self.keys[0].startswith('-')
+        rows.sort(
+            key=lambda row: row[0],
+            reverse=descending == (direction == NEXT)
+        )
+        return rows[:self.per_page + 1]
+
+    def transform(self, rows):
+        return [row for _, row in rows]
+
+    def key(self, row):
+        return row[0]
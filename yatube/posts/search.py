@@ -0,0 +1,287 @@
+"""Полнотекстовый поиск по постам, комментариям и группам.
+
+Индекс обновляется сигналами моделей. Бэкенд выбирается настройкой
+SEARCH_BACKEND: по умолчанию это таблица SQLite FTS5 с ранжированием
+bm25, для остальных баз - поиск по тексту постов через LIKE.
+Результаты выдаются страницами по курсору (ранг, rowid), без OFFSET.
+"""
+import re
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+from django.utils.safestring import mark_safe
+
+from .models import Comment, Group, Post
+from .paginators import decode_cursor, encode_cursor
+
+KINDS = {
+    Post: 'post',
+    Comment: 'comment',
+    Group: 'group',
+}
+SNIPPET_WORDS = 16
+# Границы подсветки в сниппете: заменяются на <mark> после экранирования.
+MARK_START = '\x02'
+MARK_END = '\x03'
+
+Hit = namedtuple('Hit', 'kind object_id snippet after')
+Result = namedtuple('Result', 'kind object snippet')
+SearchPage = namedtuple('SearchPage', 'object_list next_cursor')
+
+
+def match_expression(query):
+    """Запрос FTS5: каждое слово - префикс, спецсимволы отброшены."""
+    return ' '.join(f'"{word}"*' for word in re.findall(r'\w+', query))
+
+
+def document_of(instance):
+    """Индексируемый текст записи."""
+    if isinstance(instance, Group):
+        return instance.title
+    return instance.text
+
+
+def is_integer(value):
+    # bool - подкласс int, но номером записи не бывает.
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def is_number(value):
+    return is_integer(value) or isinstance(value, float)
+
+
+class SearchBackend:
+    """Интерфейс поискового индекса."""
+
+    def update(self, kind, object_id, text):
+        """Добавление или замена документа в индексе."""
+        raise NotImplementedError
+
+    def delete(self, kind, object_id):
+        """Удаление документа из индекса."""
+        raise NotImplementedError
+
+    def search(self, query, limit, after=None):
+        """До limit совпадений (Hit) по убыванию релевантности.
+
+        after - значение Hit.after последнего совпадения прошлой
+        страницы.
+        """
+        raise NotImplementedError
+
+    def check_after(self, after):
+        """Значение after из курсора; ValueError, если курсор сделан
+        не этим бэкендом."""
+        raise NotImplementedError
+
+    def filter(self, queryset, query):
+        """Записи queryset, подходящие под запрос, без ранжирования."""
+        raise NotImplementedError
+
+    def rebuild(self):
+        """Полная переиндексация."""
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """Индекс в виртуальной таблице SQLite FTS5.
+
+    Вид и номер записи упакованы в rowid, поэтому обновление документа -
+    поиск по первичному ключу, а не по всей таблице.
+    """
+    table = 'posts_search'
+    kinds = ('post', 'comment', 'group')
+
+    def rowid(self, kind, object_id):
+        return object_id * len(self.kinds) + self.kinds.index(kind)
+
+    def update(self, kind, object_id, text):
+        rowid = self.rowid(kind, object_id)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s', [rowid]
+            )
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, text) VALUES (%s, %s)',
+                [rowid, text]
+            )
+
+    def delete(self, kind, object_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [self.rowid(kind, object_id)]
+            )
+
+    def check_after(self, after):
+        """Пара (rank, rowid) последнего совпадения."""
+        if (
+            not isinstance(after, list)
+            or len(after) != 2
+            or not is_number(after[0])
+            or not is_integer(after[1])
+        ):
+            raise ValueError('Некорректный курсор.')
+        return after
+
+    def search(self, query, limit, after=None):
+        match = match_expression(query)
+        if not match:
+            return []
+        sql = (
+            f'SELECT rowid, rank, snippet({self.table}, 0, %s, %s, %s, %s) '
+            f'FROM {self.table} WHERE {self.table} MATCH %s'
+        )
+        params = [MARK_START, MARK_END, '…', SNIPPET_WORDS, match]
+        if after is not None:
+            rank, rowid = after
+            sql += ' AND (rank > %s OR (rank = %s AND rowid > %s))'
+            params += [rank, rank, rowid]
+        sql += ' ORDER BY rank, rowid LIMIT %s'
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        count = len(self.kinds)
+        return [
+            Hit(self.kinds[rowid % count], rowid // count, snippet,
+                [rank, rowid])
+            for rowid, rank, snippet in rows
+        ]
+
+    def filter(self, queryset, query):
+        match = match_expression(query)
+        if not match:
+            return queryset.none()
+        opts = queryset.model._meta
+        quote = connection.ops.quote_name
+        count = len(self.kinds)
+        return queryset.extra(
+            where=[
+                f'{quote(opts.db_table)}.{quote(opts.pk.column)} IN ('
+                f'SELECT rowid / {count} FROM {self.table} '
+                f'WHERE {self.table} MATCH %s AND rowid %% {count} = %s)'
+            ],
+            params=[match, self.kinds.index(KINDS[queryset.model])]
+        )
+
+    @transaction.atomic
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+        for model, kind in KINDS.items():
+            field = 'title' if model is Group else 'text'
+            rows = model.objects.values_list('pk', field).iterator()
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f'INSERT INTO {self.table} (rowid, text) VALUES (%s, %s)',
+                    [(self.rowid(kind, pk), text) for pk, text in rows]
+                )
+
+
+class LikeSearchBackend(SearchBackend):
+    """Поиск по тексту постов через LIKE - для баз без FTS."""
+
+    def update(self, kind, object_id, text):
+        pass
+
+    def delete(self, kind, object_id):
+        pass
+
+    def check_after(self, after):
+        """Номер последнего найденного поста."""
+        if not is_integer(after):
+            raise ValueError('Некорректный курсор.')
+        return after
+
+    def search(self, query, limit, after=None):
+        if not query.strip():
+            return []
+        posts = Post.objects.filter(text__icontains=query).order_by('-id')
+        if after is not None:
+            posts = posts.filter(id__lt=after)
+        return [
+            Hit('post', pk, text[:200], pk)
+            for pk, text in posts.values_list('pk', 'text')[:limit]
+        ]
+
+    def filter(self, queryset, query):
+        field = 'title' if queryset.model is Group else 'text'
+        return queryset.filter(**{f'{field}__icontains': query})
+
+    def rebuild(self):
+        pass
+
+
+_backend = None
+
+
+def get_backend():
+    """Поисковый бэкенд из настройки SEARCH_BACKEND."""
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.SEARCH_BACKEND)()
+    return _backend
+
+
+def index(instance):
+    """Обновление записи в поисковом индексе."""
+    get_backend().update(
+        KINDS[type(instance)], instance.pk, document_of(instance)
+    )
+
+
+def unindex(instance):
+    """Удаление записи из поискового индекса."""
+    get_backend().delete(KINDS[type(instance)], instance.pk)
+
+
+def filter_queryset(queryset, query):
+    """Фильтрация queryset постов, комментариев или групп по индексу."""
+    return get_backend().filter(queryset, query)
+
+
+def highlight(snippet):
+    """Экранированный сниппет с подсветкой совпадений."""
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+def find(query, limit, cursor=None):
+    """Страница результатов поиска с объектами моделей."""
+    backend = get_backend()
+    # С битым курсором - первая страница, как у KeysetPaginator.
+    try:
+        after = backend.check_after(decode_cursor(cursor)) if cursor else None
+    except (TypeError, ValueError):
+        after = None
+    hits = backend.search(query, limit + 1, after)
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        next_cursor = encode_cursor(hits[-1].after)
+    ids = {kind: [] for kind in KINDS.values()}
+    for hit in hits:
+        ids[hit.kind].append(hit.object_id)
+    objects = {
+        'post': Post.objects.select_related(
+            'author', 'group'
+        ).in_bulk(ids['post']),
+        'comment': Comment.objects.select_related(
+            'author', 'post'
+        ).in_bulk(ids['comment']),
+        'group': Group.objects.in_bulk(ids['group']),
+    }
+    results = [
+        Result(hit.kind, objects[hit.kind][hit.object_id],
+               highlight(hit.snippet))
+        for hit in hits
+        if hit.object_id in objects[hit.kind]
+    ]
+    return SearchPage(results, next_cursor)
@@ -0,0 +1,187 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from . import cache, counters, search, timeline
+from .models import Comment, Follow, Group, Post, TimelineEntry, User
+from .paginators import COUNT_NAMESPACE
+
+# Поля пользователя, которые выводят карточки постов и профиль.
+USER_NAME_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    """Группа поста до редактирования.
+
+    У отложенного поля (only, defer) группа не читается: обращение к
+    нему стоило бы отдельного запроса на каждый пост.
+    """
+    instance._initial_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    """Новый пост попадает в ленты подписчиков."""
+    if created:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    """Счётчик постов автора."""
+    if created:
+        counters.increment(instance.author_id, posts_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    """Счётчик постов автора."""
+    counters.increment(instance.author_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    """Сброс кеша страниц с постом."""
+    cache.bump(
+        'posts',
+        f'post:{instance.pk}',
+        f'author:{instance.author_id}',
+        *{
+            f'group:{group_id}'
+            for group_id in (instance.group_id, instance._initial_group_id)
+            if group_id is not None
+        }
+    )
+    instance._initial_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    """Сброс кеша страниц со ссылками на группу."""
+    cache.bump('posts', f'group:{instance.pk}', f'group-info:{instance.pk}')
+
+
+@receiver(post_save, sender=User)
+def invalidate_user(sender, instance, created, update_fields=None,
+                    **kwargs):
+    """Сброс карточек и страниц с именем пользователя после его смены.
+
+    У нового пользователя ещё нет постов, а вход обновляет только
+    last_login: такие сохранения пропускаются.
+    """
+    if created or (
+        update_fields and not set(update_fields) & USER_NAME_FIELDS
+    ):
+        return
+    groups = Post.objects.filter(
+        author_id=instance.pk,
+        group_id__isnull=False
+    ).order_by().values_list('group_id', flat=True).distinct()
+    cache.bump(
+        'posts',
+        f'user:{instance.pk}',
+        f'author:{instance.pk}',
+        *(f'group:{group_id}' for group_id in groups)
+    )
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    """Счётчик комментариев поста."""
+    if created:
+        counters.increment_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    """Счётчик комментариев поста."""
+    counters.increment_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment(sender, instance, **kwargs):
+    """Сброс кеша страницы поста."""
+    cache.bump(f'post:{instance.post_id}')
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, **kwargs):
+    """Счётчики подписчиков автора и подписок читателя."""
+    if created:
+        counters.increment(instance.author_id, followers_count=1)
+        counters.increment(instance.user_id, following_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    """Счётчики подписчиков автора и подписок читателя."""
+    counters.increment(instance.author_id, followers_count=-1)
+    counters.increment(instance.user_id, following_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    """Подписка добавляет посты автора в ленту."""
+    if created:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_timeline(sender, instance, **kwargs):
+    """Отписка убирает посты автора из ленты."""
+    timeline.trim(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def restore_timeline(sender, instance, **kwargs):
+    """Автор, переставший быть популярным после отписки, снова
+    раскладывается по лентам подписчиков."""
+    timeline.restore(instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow(sender, instance, **kwargs):
+    """Сброс кеша ленты подписок и профиля автора."""
+    cache.bump(
+        f'author:{instance.author_id}',
+        f'follow:{instance.user_id}'
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_counts(sender, instance, **kwargs):
+    """Сброс кешированных размеров выборок для пагинаторов.
+
+    Посты и подписки меняют и записи лент, добавляемые в обход сигналов.
+    """
+    models = [sender]
+    if sender in (Post, Follow):
+        models.append(TimelineEntry)
+    cache.bump(*(
+        COUNT_NAMESPACE.format(model._meta.label_lower) for model in models
+    ))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_save, sender=Group)
+def index_search(sender, instance, **kwargs):
+    """Обновление записи в поисковом индексе."""
+    search.index(instance)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+@receiver(post_delete, sender=Group)
+def unindex_search(sender, instance, **kwargs):
+    """Удаление записи из поискового индекса."""
+    search.unindex(instance)
@@ -0,0 +1,14 @@
+from django import template
+
+from posts import cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, aspect, show_group=True):
+    """Закешированные карточки постов страницы одним запросом к кешу.
+
+    {% post_cards page_obj "960x339" show_group=False as cards %}
+    """
+    return cards.render_many(posts, aspect, show_group)
@@ -0,0 +1,23 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def responsive_image(image, aspect, css_class='card-img-top',
+                     sizes='100vw'):
+    """Картинка с миниатюрами разной ширины и формата.
+
+    {% responsive_image post.image "960x339" sizes="960px" %}
+    """
+    width, height = aspect.split('x')
+    return {
+        'image': image,
+        'sources': thumbnails.get_sources(image, aspect),
+        'css_class': css_class,
+        'sizes': sizes,
+        'width': width,
+        'height': height,
+    }
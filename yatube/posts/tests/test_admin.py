@@ -0,0 +1,46 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+from posts.paginators import ESTIMATE_THRESHOLD
+
+
+class PostAdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='admin'
+        )
+        cls.post = Post.objects.create(text='Ёжик в тумане', author=cls.admin)
+        cls.other_post = Post.objects.create(text='Облако', author=cls.admin)
+
+    def setUp(self):
+        self.admin_client = Client()
+        self.admin_client.force_login(self.admin)
+        self.url = reverse('admin:posts_post_changelist')
+
+    def test_search_uses_index(self):
+        """Поиск в админке идёт по полнотекстовому индексу."""
+        response = self.admin_client.get(self.url, {'q': 'ёжи'})
+        changelist = response.context['cl']
+        self.assertEqual(list(changelist.result_list), [self.post])
+        self.assertEqual(changelist.result_count, 1)
+        self.assertIsNone(changelist.full_result_count)
+
+    def test_estimated_count(self):
+        """Размер большой таблицы оценивается, отфильтрованной - считается."""
+        estimate = ESTIMATE_THRESHOLD + 1
+        with mock.patch(
+            'posts.paginators.estimate_count',
+            return_value=estimate
+        ):
+            response = self.admin_client.get(self.url)
+            self.assertEqual(response.context['cl'].result_count, estimate)
+            response = self.admin_client.get(self.url, {'q': 'облако'})
+            self.assertEqual(response.context['cl'].result_count, 1)
@@ -0,0 +1,177 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.views import LIMIT
+
+
+class APITest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='test-slug',
+            description='Описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост #{i}',
+                author=cls.author,
+                group=cls.group
+            )
+            for i in range(LIMIT + 3)
+        ]
+        cls.post = cls.posts[-1]
+        Comment.objects.create(
+            post=cls.post,
+            author=cls.user,
+            text='Комментарий'
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_feeds_pages(self):
+        """Ленты отдаются страницами по курсору."""
+        urls = {
+            reverse('posts:api_index'): self.guest_client,
+            reverse(
+                'posts:api_group_list', kwargs={'slug': self.group.slug}
+            ): self.guest_client,
+            reverse(
+                'posts:api_profile', kwargs={'username': 'writer'}
+            ): self.guest_client,
+            reverse('posts:api_follow_index'): self.authorized_client,
+        }
+        for url, client in urls.items():
+            with self.subTest(url=url):
+                data = client.get(url).json()
+                self.assertEqual(len(data['results']), LIMIT)
+                self.assertEqual(data['results'][0]['text'], self.post.text)
+                self.assertEqual(data['results'][0]['author'], 'writer')
+                self.assertIsNone(data['previous'])
+                data = client.get(url, {'cursor': data['next']}).json()
+                self.assertEqual(
+                    [post['id'] for post in data['results']],
+                    [post.id for post in reversed(self.posts[:3])]
+                )
+                self.assertIsNone(data['next'])
+
+    def test_field_selection(self):
+        """Параметр fields ограничивает поля ответа."""
+        data = self.guest_client.get(
+            reverse('posts:api_index'), {'fields': 'id,author'}
+        ).json()
+        self.assertEqual(
+            data['results'][0],
+            {'id': self.post.id, 'author': 'writer'}
+        )
+        response = self.guest_client.get(
+            reverse('posts:api_index'), {'fields': 'id,password'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+    def test_internal_value_error_not_hidden(self):
+        """Ошибка в коде вида - ошибка сервера, а не ответ 400."""
+        with mock.patch(
+            'posts.api.serialize', side_effect=ValueError('сбой')
+        ):
+            with self.assertRaises(ValueError):
+                self.guest_client.get(
+                    reverse('posts:api_group_list', args=[self.group.slug])
+                )
+
+    def test_post_detail(self):
+        """Пост с комментариями; несуществующий пост - 404."""
+        data = self.guest_client.get(
+            reverse('posts:api_post_detail', kwargs={'post_id': self.post.id})
+        ).json()
+        self.assertEqual(data['post']['group'], self.group.slug)
+        self.assertEqual(
+            data['comments'],
+            [{
+                'id': self.post.comments.get().id,
+                'author': 'reader',
+                'text': 'Комментарий',
+                'created': data['comments'][0]['created'],
+            }]
+        )
+        response = self.guest_client.get(
+            reverse('posts:api_post_detail', kwargs={'post_id': 0})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_profile_and_group_info(self):
+        """Профайл и группа отдаются вместе с лентой."""
+        data = self.guest_client.get(
+            reverse('posts:api_profile', kwargs={'username': 'writer'})
+        ).json()
+        self.assertEqual(data['author']['posts_count'], len(self.posts))
+        self.assertEqual(data['author']['followers_count'], 1)
+        data = self.guest_client.get(
+            reverse('posts:api_group_list', kwargs={'slug': self.group.slug})
+        ).json()
+        self.assertEqual(data['group']['title'], 'Группа')
+        response = self.guest_client.get(
+            reverse('posts:api_group_list', kwargs={'slug': 'none'})
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_follow_feed_with_celebrity(self):
+        """Посты популярного автора в JSON-ленте идут вперемешку
+        с записями ленты."""
+        celebrity = User.objects.create_user(username='celebrity')
+        Follow.objects.create(user=self.user, author=celebrity)
+        post = Post.objects.create(text='Популярный', author=celebrity)
+        url = reverse('posts:api_follow_index')
+        with mock.patch('posts.timeline.FANOUT_LIMIT', 0):
+            data = self.authorized_client.get(
+                url, {'fields': 'id,author'}
+            ).json()
+            self.assertEqual(
+                data['results'][:2],
+                [
+                    {'id': post.pk, 'author': 'celebrity'},
+                    {'id': self.post.pk, 'author': 'writer'},
+                ]
+            )
+            data = self.authorized_client.get(
+                url, {'cursor': data['next']}
+            ).json()
+        self.assertEqual(
+            [row['id'] for row in data['results']],
+            [post.id for post in reversed(self.posts[:4])]
+        )
+
+    def test_follow_requires_login(self):
+        """Гость получает 401 вместо перенаправления."""
+        response = self.guest_client.get(reverse('posts:api_follow_index'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_single_query_per_page(self):
+        """Лента выбирается одним запросом, без JOIN лишних таблиц."""
+        url = reverse('posts:api_index')
+        self.guest_client.get(url)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(url, {'fields': 'id,text'})
+        selects = [
+            query['sql'] for query in queries
+            if 'posts_post' in query['sql']
+        ]
+        self.assertEqual(len(selects), 1)
+        self.assertNotIn('JOIN', selects[0])
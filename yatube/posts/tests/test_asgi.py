@@ -0,0 +1,148 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.wsgi import get_wsgi_application
+from django.test import TestCase
+
+from core.asgi import BUFFER_CHUNKS, WSGIBridge
+from posts.models import Post
+
+
+class InlineExecutor(Executor):
+    """Выполнение в текущем потоке: тест видит свою транзакцию."""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+class ASGIBridgeTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(text='Пост для ASGI', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.application = WSGIBridge(
+            get_wsgi_application(),
+            executor=InlineExecutor()
+        )
+
+    def request(self, path, method='GET', body=b'', query_string=b'',
+                headers=()):
+        messages = []
+        chunks = [body[:5], body[5:]]
+
+        async def receive():
+            chunk = chunks.pop(0)
+            return {
+                'type': 'http.request',
+                'body': chunk,
+                'more_body': bool(chunks),
+            }
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(self.application({
+            'type': 'http',
+            'method': method,
+            'path': path,
+            'query_string': query_string,
+            'headers': [
+                (b'host', b'testserver'),
+                (b'content-type', b'application/x-www-form-urlencoded'),
+                (b'content-length', str(len(body)).encode()),
+                *headers,
+            ],
+        }, receive, send))
+        start, *bodies = messages
+        self.assertFalse(bodies[-1].get('more_body', False))
+        return start, b''.join(message['body'] for message in bodies)
+
+    def test_get_feed(self):
+        """Лента отдаётся через ASGI."""
+        start, body = self.request('/')
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/html; charset=utf-8'),
+                      start['headers'])
+        self.assertIn('Пост для ASGI', body.decode())
+
+    def test_query_string_and_unicode_path(self):
+        """Параметры и путь в UTF-8 доходят до вида."""
+        start, body = self.request(
+            '/search/', query_string='q=ASGI'.encode()
+        )
+        self.assertEqual(start['status'], 200)
+        self.assertIn('<mark>ASGI</mark>', body.decode())
+        start, _ = self.request('/profile/нет-такого/')
+        self.assertEqual(start['status'], 404)
+
+    def test_post_body(self):
+        """Тело запроса, пришедшее частями, передаётся виду."""
+        token = 'a' * 32
+        start, body = self.request(
+            '/auth/login/',
+            'POST',
+            f'csrfmiddlewaretoken={token}&username=asgi-user&password=x'
+            .encode(),
+            headers=[(b'cookie', f'csrftoken={token}'.encode())]
+        )
+        self.assertEqual(start['status'], 200)
+        self.assertIn('value="asgi-user"', body.decode())
+
+    def test_request_handled_in_one_thread(self):
+        """Вызов приложения, чтение ответа и close() - в одном потоке."""
+        threads = []
+
+        class Result:
+            def __iter__(self):
+                for number in range(BUFFER_CHUNKS * 3):
+                    threads.append(threading.get_ident())
+                    yield f'{number};'.encode()
+
+            def close(self):
+                threads.append(threading.get_ident())
+
+        def wsgi_application(environ, start_response):
+            threads.append(threading.get_ident())
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return Result()
+
+        executor = ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(executor.shutdown)
+        self.application = WSGIBridge(wsgi_application, executor=executor)
+        start, body = self.request('/')
+        self.assertEqual(start['status'], 200)
+        self.assertEqual(
+            body.decode(),
+            ''.join(f'{number};' for number in range(BUFFER_CHUNKS * 3))
+        )
+        self.assertEqual(len(set(threads)), 1)
+        self.assertNotEqual(threads[0], threading.get_ident())
+
+    def test_lifespan(self):
+        """Сервер получает подтверждение запуска и остановки."""
+        messages = iter([
+            {'type': 'lifespan.startup'},
+            {'type': 'lifespan.shutdown'},
+        ])
+        sent = []
+
+        async def receive():
+            return next(messages)
+
+        async def send(message):
+            sent.append(message['type'])
+
+        asyncio.run(self.application({'type': 'lifespan'}, receive, send))
+        self.assertEqual(
+            sent,
+            ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+        )
@@ -0,0 +1,184 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils.module_loading import import_string
+
+from core.cache import LRUCache
+from posts.cache import bump, get_or_set, get_versions
+
+
+class StampedeCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.compute = mock.Mock(return_value='свежее')
+
+    def test_value_is_computed_once(self):
+        """Значение считается один раз и берётся из кеша."""
+        for _ in range(3):
+            value = get_or_set('key', self.compute, 60)
+            self.assertEqual(value, 'свежее')
+        self.compute.assert_called_once()
+
+    def test_stale_value_while_locked(self):
+        """Пока запись пересчитывает другой процесс,
+        отдаётся устаревшее значение."""
+        cache.set('key', ('старое', 0, 0), 60)
+        cache.add('key:lock', 1)
+        self.assertEqual(get_or_set('key', self.compute, 60), 'старое')
+        self.compute.assert_not_called()
+
+    def test_stale_key_while_locked(self):
+        """Новой версии записи ещё нет - отдаётся прошлая версия."""
+        cache.set('stale', 'прошлая версия', 60)
+        cache.add('key:lock', 1)
+        value = get_or_set('key', self.compute, 60, stale_key='stale')
+        self.assertEqual(value, 'прошлая версия')
+        self.compute.assert_not_called()
+
+    def test_expired_value_is_recomputed(self):
+        """Просроченная запись пересчитывается."""
+        cache.set('key', ('старое', 0, 0), 60)
+        self.assertEqual(get_or_set('key', self.compute, 60), 'свежее')
+        self.assertFalse(cache.get('key:lock'))
+
+    def test_not_cacheable_value(self):
+        """Неподходящее значение не попадает в кеш."""
+        get_or_set('key', self.compute, 60, cacheable=lambda value: False)
+        self.assertIsNone(cache.get('key'))
+
+
+class SharedBackendTests(TestCase):
+    """Версии и записи видны всем процессам с общим кешем."""
+
+    def other_process_cache(self):
+        """Отдельный экземпляр бэкенда - как в другом процессе."""
+        params = settings.CACHES['default']
+        return import_string(params['BACKEND'])(params['LOCATION'], {})
+
+    def check_shared(self):
+        cache.clear()
+        other = self.other_process_cache()
+        version, = get_versions(['posts'])
+        bump('posts')
+        self.assertEqual(other.get('version:posts'), version + 1)
+        compute = mock.Mock(return_value='страница')
+        get_or_set('page', compute, 60)
+        self.assertEqual(other.get('page')[0], 'страница')
+
+    def test_file_backend(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        with override_settings(CACHES={'default': {
+            'BACKEND': settings.CACHE_BACKENDS['file'],
+            'LOCATION': location,
+        }}):
+            self.check_shared()
+
+    def test_db_backend(self):
+        with override_settings(CACHES={'default': {
+            'BACKEND': settings.CACHE_BACKENDS['db'],
+            'LOCATION': settings.CACHE_LOCATIONS['db'],
+        }}):
+            call_command('createcachetable', verbosity=0)
+            self.check_shared()
+
+
+class LRUCacheTests(TestCase):
+    def setUp(self):
+        self.stats_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.stats_dir, ignore_errors=True)
+        self.params = {
+            'BACKEND': 'core.cache.LRUCache',
+            'LOCATION': 'lru-test',
+            'OPTIONS': {'MAX_BYTES': 1000, 'STATS_DIR': self.stats_dir},
+        }
+        self.cache = LRUCache(self.params['LOCATION'], self.params)
+        self.cache.clear()
+        self.cache.reset_stats()
+
+    def test_evicts_least_recently_used_by_size(self):
+        """Переполнение вытесняет давно не читавшиеся записи."""
+        for i in range(3):
+            self.cache.set(f'feed:{i}', 'x' * 250)
+        self.cache.get('feed:0')
+        self.cache.set('post_card:1', 'x' * 250)
+        self.assertIsNone(self.cache.get('feed:1'))
+        self.assertIsNotNone(self.cache.get('feed:0'))
+        self.assertIsNotNone(self.cache.get('post_card:1'))
+        self.assertLessEqual(self.cache.stats()['bytes'], 1000)
+        self.cache.set('feed:big', 'x' * 2000)
+        self.assertIsNone(self.cache.get('feed:big'))
+
+    def test_stats_by_prefix(self):
+        """Попадания, промахи и вытеснения считаются по префиксам."""
+        self.cache.set('version:posts', 1)
+        self.cache.incr('version:posts')
+        self.cache.get_many(['version:posts', 'version:post:1'])
+        for i in range(5):
+            self.cache.set(f'feed:{i}', 'x' * 300)
+        prefixes = self.cache.stats()['prefixes']
+        self.assertEqual(prefixes['version']['hits'], 1)
+        self.assertEqual(prefixes['version']['misses'], 1)
+        self.assertEqual(prefixes['feed']['evictions'], 2)
+
+    def test_cache_stats_command(self):
+        """Команда суммирует статистику живых процессов."""
+        self.cache.get('feed:1')
+        # Свой файл команда не читает: её статистика берётся из памяти.
+        self.cache.dump_stats()
+        other = self.cache.stats()
+        other['pid'] = os.getppid()
+        other['prefixes'] = {'feed': {'hits': 3, 'misses': 1}}
+        with open(self.cache.stats_path(other['pid']), 'w') as file:
+            json.dump(other, file)
+        finished = subprocess.Popen([sys.executable, '-c', ''])
+        finished.wait()
+        dead_path = self.cache.stats_path(finished.pid)
+        with open(dead_path, 'w') as file:
+            json.dump(dict(other, pid=finished.pid), file)
+        out = StringIO()
+        with override_settings(CACHES={
+            'default': settings.CACHES['default'],
+            'lru': self.params,
+        }):
+            call_command('cache_stats', alias='lru', json=True, stdout=out)
+        summary = json.loads(out.getvalue())
+        self.assertEqual(summary['processes'], 2)
+        self.assertEqual(
+            summary['prefixes']['feed'],
+            {'hits': 3, 'misses': 2, 'evictions': 0}
+        )
+        self.assertFalse(os.path.exists(dead_path))
+
+    def test_concurrent_dumps(self):
+        """Потоки сохраняют статистику одновременно без ошибок."""
+        errors = []
+
+        def dump():
+            try:
+                for _ in range(50):
+                    self.cache.dump_stats()
+            except OSError as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=dump) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(
+            os.listdir(self.stats_dir),
+            [os.path.basename(self.cache.stats_path())]
+        )
@@ -0,0 +1,89 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from posts.models import Comment, Follow, Post
+
+
+class ExportPostsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='writer')
+        cls.posts = [
+            Post.objects.create(text=f'Пост #{i}', author=cls.author)
+            for i in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0],
+            author=cls.user,
+            text='Комментарий'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output)
+
+    def export(self, *args):
+        call_command(
+            'export_posts', '--output', self.output, '--chunk-size', '2',
+            *args, stdout=StringIO()
+        )
+
+    def read_ndjson(self, name, opener=open):
+        with opener(os.path.join(self.output, name), 'rt') as file:
+            return [json.loads(line) for line in file]
+
+    def test_ndjson_all_models(self):
+        """Каждая модель выгружается в свой файл по строке на запись."""
+        self.export()
+        posts = self.read_ndjson('post.ndjson')
+        self.assertEqual(
+            [post['id'] for post in posts],
+            [post.id for post in self.posts]
+        )
+        self.assertEqual(posts[0]['text'], 'Пост #0')
+        self.assertEqual(posts[0]['author_id'], self.author.id)
+        self.assertEqual(
+            posts[0]['pub_date'],
+            self.posts[0].pub_date.isoformat()
+        )
+        self.assertEqual(len(self.read_ndjson('comment.ndjson')), 1)
+        self.assertEqual(
+            self.read_ndjson('follow.ndjson'),
+            [{
+                'id': Follow.objects.get().id,
+                'user_id': self.user.id,
+                'author_id': self.author.id,
+            }]
+        )
+
+    def test_gzip_csv_resume(self):
+        """Выгрузка продолжается после id, дописывая сжатый файл."""
+        self.export('--model', 'post', '--format', 'csv', '--gzip')
+        last_id = self.posts[-1].id
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        self.export(
+            '--model', 'post', '--format', 'csv', '--gzip',
+            '--after-id', str(last_id)
+        )
+        with gzip.open(os.path.join(self.output, 'post.csv.gz'), 'rt') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(
+            [(int(row['id']), row['text']) for row in rows],
+            [(post.id, post.text) for post in self.posts + [new_post]]
+        )
+
+    def test_after_id_needs_single_model(self):
+        with self.assertRaises(CommandError):
+            self.export('--after-id', '1')
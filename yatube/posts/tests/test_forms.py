@@ -2,6 +2,7 @@ import shutil
 import tempfile
 
 from http import HTTPStatus
+from unittest import mock
 from django.contrib.auth.models import User
 from django.test import Client, TestCase
 from django.urls import reverse
@@ -101,6 +102,21 @@ class PostFormTests(TestCase):
         self.assertEqual(post.group, self.post.group)
         self.assertEqual(post.image, self.post.image)
 
+    @mock.patch('posts.thumbnails.schedule')
+    def test_thumbnails_scheduled_on_save(self, schedule):
+        """Миниатюры ставятся в очередь при создании и редактировании."""
+        self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Пост с картинкой'}
+        )
+        post = Post.objects.get(text='Пост с картинкой')
+        schedule.assert_called_once_with(post.image)
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            data={'text': 'Отредактирован'}
+        )
+        self.assertEqual(schedule.call_count, 2)
+
     def test_edit_post_authorized_client(self):
         """Редактирование поста авторизованным пользователем."""
         posts_count = Post.objects.count()
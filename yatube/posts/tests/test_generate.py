@@ -0,0 +1,80 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase
+
+from posts.management.commands.benchmark_views import MUTATING
+from posts.models import Comment, Follow, Post, TimelineEntry
+from posts.urls import urlpatterns
+
+
+class GenerateDataTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'generate_data', '--users', '50', '--groups', '3',
+            '--posts', '500', '--comments', '100', '--follows', '5',
+            '--images', '0', '--alpha', '1.5', stdout=StringIO()
+        )
+
+    def test_volumes_and_derived_data(self):
+        """Создаются записи заданного объёма и пересчитываются счётчики."""
+        self.assertEqual(User.objects.count(), 50)
+        self.assertEqual(Post.objects.count(), 500)
+        self.assertEqual(Comment.objects.count(), 100)
+        self.assertTrue(Follow.objects.exists())
+        self.assertTrue(TimelineEntry.objects.exists())
+        post = Post.objects.order_by('-comments_count').first()
+        self.assertEqual(post.comments_count, post.comments.count())
+        self.assertFalse(
+            Follow.objects.filter(user=F('author')).exists()
+        )
+
+    def test_power_law_authors(self):
+        """Самый активный автор пишет намного больше среднего."""
+        counts = sorted(
+            (user.counters.posts_count for user in User.objects.all()),
+            reverse=True
+        )
+        self.assertGreater(counts[0], 5 * sum(counts) / len(counts))
+
+    def test_posts_ordered_by_date(self):
+        """Номера постов идут в порядке публикации."""
+        dates = list(Post.objects.order_by('id').values_list(
+            'pub_date', flat=True
+        ))
+        self.assertEqual(dates, sorted(dates))
+
+    def test_benchmark_views(self):
+        """Все адреса posts измеряются и сохраняются в JSON."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'results.json')
+            output = StringIO()
+            call_command(
+                'benchmark_views', '--iterations', '2', '--warmup', '0',
+                '--output', path, stdout=output
+            )
+            call_command(
+                'benchmark_views', '--iterations', '2', '--warmup', '0',
+                '--cold', '--compare', path, stdout=output
+            )
+            with open(path) as file:
+                report = json.load(file)
+        self.assertEqual(
+            set(report['results']),
+            {
+                pattern.name for pattern in urlpatterns
+                if pattern.name not in MUTATING
+            }
+        )
+        for name, result in report['results'].items():
+            with self.subTest(name=name):
+                self.assertLess(result['status'], 400)
+                self.assertLessEqual(result['p50'], result['p99'])
+        self.assertIn('Сравнение', output.getvalue())
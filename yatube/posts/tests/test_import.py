@@ -0,0 +1,145 @@
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, TransactionTestCase
+
+from posts import search
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+
+
+class ImportTestMixin:
+    def setUp(self):
+        self.input = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.input)
+
+    def write(self, name, rows):
+        path = os.path.join(self.input, name)
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(path, 'wt', encoding='utf-8') as file:
+            file.write(''.join(f'{row}\n' for row in rows))
+        return path
+
+    def load(self, *args):
+        output = StringIO()
+        call_command('import_posts', *args, stdout=output)
+        return output.getvalue()
+
+
+class ImportPostsTest(ImportTestMixin, TestCase):
+    def test_export_import_round_trip(self):
+        """Выгрузка export_posts загружается обратно с теми же данными."""
+        user = User.objects.create_user(username='auth')
+        author = User.objects.create_user(username='writer')
+        post = Post.objects.create(text='Пост', author=author)
+        comment = Comment.objects.create(post=post, author=user, text='Ком')
+        Follow.objects.create(user=user, author=author)
+        expected = list(Post.objects.values()), list(Comment.objects.values())
+        call_command(
+            'export_posts', '--output', self.input, '--gzip',
+            stdout=StringIO()
+        )
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+        output = self.load(
+            *(os.path.join(self.input, f'{name}.ndjson.gz')
+              for name in ('follow', 'comment', 'post')),
+            '--batch-size', '1'
+        )
+        self.assertIn('строк/с', output)
+        self.assertEqual(
+            (list(Post.objects.values()), list(Comment.objects.values())),
+            expected
+        )
+        self.assertEqual(Comment.objects.get().pk, comment.pk)
+        self.assertEqual(author.counters.followers_count, 1)
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('user', 'post')),
+            [(user.pk, post.pk)]
+        )
+        self.assertEqual(len(search.find('Пост', 10).object_list), 1)
+
+    def test_names_csv_and_missing_references(self):
+        """Авторы и группы по именам, создание недостающих."""
+        User.objects.create_user(username='writer')
+        path = self.write('post.csv', [
+            'text,author,group,pub_date',
+            'Первый,writer,,2020-01-01T00:00:00+00:00',
+            'Второй,newbie,news,',
+        ])
+        output = self.load(path)
+        self.assertIn('пропущено 1', output)
+        self.assertEqual(
+            list(Post.objects.values_list('text', 'author__username')),
+            [('Первый', 'writer')]
+        )
+        self.assertEqual(Post.objects.get().pub_date.year, 2020)
+        self.load(path, '--create-missing', '--skip-rebuild')
+        post = Post.objects.get(text='Второй')
+        self.assertEqual(post.author.username, 'newbie')
+        self.assertEqual(post.group, Group.objects.get(slug='news'))
+
+    def test_unknown_references_skipped(self):
+        """Строки со ссылками на несуществующие посты и группы
+        пропускаются, а не прерывают загрузку."""
+        user = User.objects.create_user(username='writer')
+        post = Post.objects.create(text='Пост', author=user)
+        path = self.write('comment.ndjson', [
+            json.dumps({'post_id': post.pk, 'author': 'writer', 'text': 'Да'}),
+            json.dumps({'post_id': 0, 'author': 'writer', 'text': 'Нет'}),
+            json.dumps({'author': 'writer', 'text': 'Без поста'}),
+        ])
+        output = self.load(path)
+        self.assertIn('пропущено 2', output)
+        self.assertEqual(
+            list(Comment.objects.values_list('text', flat=True)), ['Да']
+        )
+        path = self.write('post.csv', [
+            'text,author_id,group_id,group',
+            f'С группой,{user.pk},0,',
+            f'Неизвестная группа,{user.pk},,unknown',
+            f'Без группы,{user.pk},,',
+        ])
+        output = self.load(path)
+        self.assertIn('пропущено 2', output)
+        self.assertTrue(Post.objects.filter(text='Без группы').exists())
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_rebuild_after_failure(self):
+        """Если загрузка прервана, загруженная часть всё равно
+        пересчитывается."""
+        user = User.objects.create_user(username='writer')
+        path = self.write('post.ndjson', [
+            json.dumps({'id': 1000, 'text': 'Первый', 'author': 'writer'}),
+            json.dumps({'id': 1000, 'text': 'Повтор', 'author': 'writer'}),
+        ])
+        with self.assertRaises(IntegrityError):
+            self.load(path, '--batch-size', '1')
+        self.assertEqual(Post.objects.count(), 1)
+        user.counters.refresh_from_db()
+        self.assertEqual(user.counters.posts_count, 1)
+
+
+class DeferredIndexesTest(ImportTestMixin, TransactionTestCase):
+    def indexes(self):
+        with connection.cursor() as cursor:
+            return connection.introspection.get_constraints(
+                cursor, Post._meta.db_table
+            )
+
+    def test_indexes_recreated(self):
+        """Индексы удаляются на время загрузки и создаются заново."""
+        User.objects.create_user(username='writer')
+        before = set(self.indexes())
+        path = self.write('post.ndjson', [
+            json.dumps({'text': 'Пост', 'author': 'writer'})
+        ])
+        self.load(path, '--defer-indexes', '--skip-rebuild')
+        self.assertEqual(set(self.indexes()), before)
+        self.assertEqual(Post.objects.count(), 1)
@@ -0,0 +1,76 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+
+class FeedIndexTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.group = Group.objects.create(
+            title='Тест-группа',
+            slug='test-slug',
+            description='Тест-описание',
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(15):
+            cls.post = Post.objects.create(
+                text=f'Пост #{i}',
+                author=cls.author,
+                group=cls.group
+            )
+            Comment.objects.create(
+                post=cls.post,
+                author=cls.user,
+                text=f'Комментарий #{i}'
+            )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def query_plans(self, url, data=None):
+        with CaptureQueriesContext(connection) as context:
+            self.authorized_client.get(url, data)
+        plans = {}
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if 'ORDER BY' not in query['sql']:
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plans[query['sql']] = ' '.join(
+                    row[-1] for row in cursor.fetchall()
+                )
+        return plans
+
+    def test_feed_queries_use_indexes(self):
+        """Основные запросы страниц читают индекс, а не сортируют."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:follow_index'),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+        for url in urls:
+            response = self.authorized_client.get(url)
+            page_obj = response.context.get('page_obj')
+            cache.clear()
+            pages = [None]
+            if page_obj is not None:
+                pages.append({'cursor': page_obj.next_cursor})
+            for data in pages:
+                plans = self.query_plans(url, data)
+                self.assertTrue(plans)
+                for sql, plan in plans.items():
+                    with self.subTest(url=url, data=data, sql=sql):
+                        self.assertNotIn('TEMP B-TREE', plan)
+                        self.assertIn('INDEX', plan)
@@ -1,11 +1,13 @@
+import os
 import shutil
 import tempfile
 
 from django.contrib.auth.models import User
 from django.conf import settings
+from django.core.management import call_command
 from django.test import TestCase
 
-from posts.models import Group, Post
+from posts.models import Comment, Follow, Group, Post, UserCounters
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -39,3 +41,59 @@ class PostModelTest(TestCase):
         self.assertEqual(
             str(post), post.text[:15], "У постов неправильный __str__"
         )
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='auth')
+        cls.reader = User.objects.create(username='reader')
+
+    def assertCounters(self, user, **expected):
+        counters = UserCounters.objects.get(user=user)
+        for name, value in expected.items():
+            with self.subTest(user=user, name=name):
+                self.assertEqual(getattr(counters, name), value)
+
+    def test_counters_follow_changes(self):
+        """Счётчики меняются при создании и удалении записей."""
+        post = Post.objects.create(author=self.user, text='Пост')
+        Post.objects.create(author=self.user, text='Второй пост')
+        comment = Comment.objects.create(
+            post=post,
+            author=self.reader,
+            text='Комментарий'
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.user)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertCounters(self.user, posts_count=2, followers_count=1)
+        self.assertCounters(self.reader, posts_count=0, following_count=1)
+        comment.delete()
+        follow.delete()
+        post.delete()
+        self.assertEqual(
+            Post.objects.get().comments_count,
+            0
+        )
+        self.assertCounters(self.user, posts_count=1, followers_count=0)
+        self.assertCounters(self.reader, following_count=0)
+
+    def test_rebuild_counters(self):
+        """Команда rebuild_counters пересчитывает счётчики."""
+        post = Post.objects.create(author=self.user, text='Пост')
+        Comment.objects.create(post=post, author=self.reader, text='Текст')
+        Follow.objects.create(user=self.reader, author=self.user)
+        UserCounters.objects.all().delete()
+        Post.objects.update(comments_count=0)
+        call_command('rebuild_counters', stdout=open(os.devnull, 'w'))
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertCounters(
+            self.user,
+            posts_count=1,
+            followers_count=1,
+            following_count=0
+        )
+        self.assertCounters(self.reader, posts_count=0, following_count=1)
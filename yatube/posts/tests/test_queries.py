@@ -0,0 +1,127 @@
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.views import LIMIT
+
+MAX_QUERIES = 12
+
+
+class QueryCountTests(TestCase):
+    """Число запросов страниц не зависит от числа постов и комментариев."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тест-группа',
+            slug='test-slug',
+            description='Тест-описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    @contextmanager
+    def assertMaxNumQueries(self, number):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        self.assertLessEqual(
+            len(context),
+            number,
+            '\n'.join(query['sql'] for query in context.captured_queries)
+        )
+
+    def add_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(
+                text=f'Пост #{i}',
+                author=self.author,
+                group=self.group
+            )
+            for j in range(3):
+                Comment.objects.create(
+                    post=post,
+                    author=self.reader,
+                    text=f'Комментарий #{j}'
+                )
+        return post
+
+    def requests(self, post):
+        """Все адреса posts/urls.py: клиент, метод, адрес, данные."""
+        post_id = {'post_id': post.pk}
+        author = {'username': self.author.username}
+        return [
+            (self.reader_client, 'get', reverse('posts:index'), None),
+            (
+                self.reader_client,
+                'get',
+                reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+                None
+            ),
+            (self.reader_client, 'get', reverse(
+                'posts:profile', kwargs=author), None),
+            (self.reader_client, 'get', reverse(
+                'posts:post_detail', kwargs=post_id), None),
+            (self.reader_client, 'get', reverse(
+                'posts:comment_list', kwargs=post_id), None),
+            (self.reader_client, 'get', reverse(
+                'posts:comment_list', kwargs=post_id), {'format': 'json'}),
+            (self.author_client, 'get', reverse(
+                'posts:post_edit', kwargs=post_id), None),
+            (self.author_client, 'post', reverse(
+                'posts:post_edit', kwargs=post_id), {'text': 'Правка'}),
+            (self.author_client, 'get', reverse('posts:post_create'), None),
+            (self.author_client, 'post', reverse(
+                'posts:post_create'), {'text': 'Новый пост'}),
+            (self.reader_client, 'post', reverse(
+                'posts:add_comment', kwargs=post_id), {'text': 'Ещё'}),
+            (self.reader_client, 'get', reverse('posts:follow_index'), None),
+            (self.reader_client, 'get', reverse(
+                'posts:profile_unfollow', kwargs=author), None),
+            (self.reader_client, 'get', reverse(
+                'posts:profile_follow', kwargs=author), None),
+        ]
+
+    def count_queries(self, post):
+        counts = {}
+        for client, method, url, data in self.requests(post):
+            cache.clear()
+            with self.assertMaxNumQueries(MAX_QUERIES) as context:
+                response = getattr(client, method)(url, data)
+            self.assertLess(response.status_code, 400)
+            counts[method, url, str(data)] = len(context)
+        return counts
+
+    def test_queries_do_not_depend_on_data_size(self):
+        """Страницы выполняют ограниченное и постоянное число запросов."""
+        post = self.add_posts(LIMIT + 1)
+        small = self.count_queries(post)
+        self.add_posts(15)
+        large = self.count_queries(post)
+        for request, count in small.items():
+            with self.subTest(request=request):
+                self.assertEqual(large[request], count)
+
+    def test_deferred_posts_without_extra_queries(self):
+        """Выборка постов с only() и defer() - один запрос."""
+        self.add_posts(3)
+        for queryset in (
+            Post.objects.only('id'),
+            Post.objects.defer('group'),
+        ):
+            with self.subTest(query=str(queryset.query)):
+                with self.assertNumQueries(1):
+                    list(queryset)
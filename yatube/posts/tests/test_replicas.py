@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core.routers import (WRITE_COOKIE, ReplicaRouter, read_from_replica,
+                          replica_reads)
+from posts.cache import bump, cache_feed, recently_bumped
+from posts.models import Post
+
+router = ReplicaRouter()
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_reads_from_replica_only_inside_block(self):
+        """С реплики читаются только посты внутри replica_reads()."""
+        self.assertIsNone(router.db_for_read(Post))
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Post), 'replica1')
+            self.assertIsNone(router.db_for_read(Session))
+            self.assertEqual(router.db_for_write(Post), 'default')
+        self.assertIsNone(router.db_for_read(Post))
+        self.assertFalse(router.allow_migrate('replica1', 'posts'))
+
+    @override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+    def test_one_replica_per_block(self):
+        """Все запросы блока, и вложенных тоже, идут на одну реплику."""
+        for _ in range(20):
+            with replica_reads():
+                alias = router.db_for_read(Post)
+                self.assertIn(alias, settings.DATABASE_REPLICAS)
+                for _ in range(5):
+                    self.assertEqual(router.db_for_read(Post), alias)
+                with replica_reads():
+                    self.assertEqual(router.db_for_read(Post), alias)
+                with replica_reads(False):
+                    self.assertIsNone(router.db_for_read(Post))
+                self.assertEqual(router.db_for_read(Post), alias)
+
+    def test_view_decorator(self):
+        """Безопасные запросы без недавней записи идут на реплику."""
+        @read_from_replica
+        def view(request):
+            return HttpResponse(router.db_for_read(Post))
+
+        get = self.factory.get('/')
+        recent_write = self.factory.get('/')
+        recent_write.COOKIES[WRITE_COOKIE] = '1'
+        post = self.factory.post('/')
+        self.assertEqual(view(get).content, b'replica1')
+        self.assertEqual(view(recent_write).content, b'None')
+        self.assertEqual(view(post).content, b'None')
+
+    def test_fresh_reads_after_bump(self):
+        """Недавно изменённая лента кешируется по данным основной базы."""
+        @read_from_replica
+        @cache_feed('posts')
+        def view(request):
+            return HttpResponse(router.db_for_read(Post))
+
+        cache.clear()
+        request = self.factory.get('/')
+        request.user = AnonymousUser()
+        self.assertEqual(view(request).content, b'replica1')
+        bump('posts')
+        self.assertEqual(recently_bumped(['posts', 'group:1']), {'posts'})
+        self.assertEqual(view(request).content, b'None')
+        with override_settings(DATABASE_REPLICAS=[]):
+            bump('group:1')
+        self.assertEqual(recently_bumped(['group:1']), set())
+
+
+class ReadAfterWriteTests(TestCase):
+    def test_write_sets_cookie(self):
+        """После изменения клиент читает с основной базы."""
+        user = User.objects.create_user(username='auth')
+        client = Client()
+        client.force_login(user)
+        response = client.get(reverse('posts:index'))
+        self.assertNotIn(WRITE_COOKIE, response.cookies)
+        response = client.post(
+            reverse('posts:post_create'),
+            {'text': 'Новый пост'}
+        )
+        self.assertIn(WRITE_COOKIE, response.cookies)
+
+    def test_follow_by_get_sets_cookie(self):
+        """Подписка и отписка по GET тоже ставят метку записи."""
+        user = User.objects.create_user(username='auth')
+        User.objects.create_user(username='author')
+        client = Client()
+        client.force_login(user)
+        for name in ('posts:profile_follow', 'posts:profile_unfollow'):
+            with self.subTest(name=name):
+                response = client.get(
+                    reverse(name, kwargs={'username': 'author'})
+                )
+                self.assertIn(WRITE_COOKIE, response.cookies)
+                client.cookies.pop(WRITE_COOKIE)
@@ -0,0 +1,50 @@
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from core.db import pragma_statements
+
+
+class SQLitePragmaTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied(self):
+        """Новое соединение получает PRAGMA из настроек."""
+        self.assertEqual(
+            self.pragma('busy_timeout'),
+            settings.SQLITE_PRAGMAS['busy_timeout']
+        )
+        self.assertEqual(
+            self.pragma('cache_size'),
+            settings.SQLITE_PRAGMAS['cache_size']
+        )
+
+    def test_invalid_pragma(self):
+        """Подстановка SQL в PRAGMA запрещена."""
+        for pragmas in (
+            {'journal_mode': 'WAL; DROP TABLE posts_post'},
+            {'cache_size; --': 1},
+        ):
+            with self.subTest(pragmas=pragmas):
+                with self.assertRaises(ValueError):
+                    pragma_statements(pragmas)
+
+    def test_benchmark_command(self):
+        """Бенчмарк сравнивает настройки по умолчанию и SQLITE_PRAGMAS."""
+        out = StringIO()
+        call_command(
+            'sqlite_benchmark',
+            rows=100,
+            readers=2,
+            seconds=0.1,
+            stdout=out
+        )
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith('SQLITE_PRAGMAS: чтений'))
@@ -1,15 +1,25 @@
+import os
 import shutil
 import tempfile
+from io import BytesIO
+from unittest import mock
 
 from django.contrib.auth.models import User
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.core.cache import cache
 from django import forms
+from PIL import Image
 
-from posts.models import Group, Post, Follow
+from posts.models import Comment, Group, Post, Follow, TimelineEntry
+from posts import cards, thumbnails, timeline
+from posts.cache import get_versions, make_key
+from posts.paginators import MergedPaginator, encode_cursor
+from posts.views import COMMENTS_LIMIT, LIMIT
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -276,16 +286,18 @@ class PostPagesTests(TestCase):
     def test_cache_index_page(self):
         """Проверка работы кеша главной страницы."""
         cache.clear()
+        post = Post.objects.create(text='Удаляемый пост', author=self.user)
+        post_url = reverse('posts:post_detail', kwargs={'post_id': post.pk})
         url = reverse('posts:index')
-        response = self.authorized_client.get(url)
+        response = self.other_client.get(url)
         cache_check = response.content
-        post = Post.objects.get(pk=1)
-        post.delete()
-        response = self.authorized_client.get(url)
+        self.assertContains(response, post_url)
+        with self.assertNumQueries(0):
+            response = self.other_client.get(url)
         self.assertEqual(response.content, cache_check)
-        cache.clear()
-        response = self.authorized_client.get(url)
-        self.assertNotEqual(response.content, cache_check)
+        post.delete()
+        response = self.other_client.get(url)
+        self.assertNotContains(response, post_url)
 
     def test_authorized_client_follow(self):
         """Подписка авторизованным клиентом
@@ -388,6 +400,7 @@ class PaginatorViewsTest(TestCase):
 
     def setUp(self):
         self.unauthorized_client = Client()
+        cache.clear()
 
     def test_paginator_on_pages(self):
         """Проверка пагинации на страницах."""
@@ -398,11 +411,661 @@ class PaginatorViewsTest(TestCase):
         ]
         for reverse_ in url_pages:
             with self.subTest(reverse_=reverse_):
-                self.assertEqual(len(self.unauthorized_client.get(
-                    reverse_).context.get('page_obj')),
+                first_page = self.unauthorized_client.get(
+                    reverse_).context.get('page_obj')
+                self.assertEqual(
+                    len(first_page),
                     PaginatorViewsTest.posts_on_first_page
                 )
-                self.assertEqual(len(self.unauthorized_client.get(
-                    reverse_ + '?page=2').context.get('page_obj')),
+                self.assertIsNone(first_page.previous_cursor)
+                second_page = self.unauthorized_client.get(
+                    reverse_,
+                    {'cursor': first_page.next_cursor}
+                ).context.get('page_obj')
+                self.assertEqual(
+                    len(second_page),
                     PaginatorViewsTest.posts_on_second_page
                 )
+                self.assertEqual(second_page.number, 2)
+                self.assertIsNone(second_page.next_cursor)
+                self.assertTrue(set(first_page).isdisjoint(second_page))
+
+    def test_paginator_previous_cursor(self):
+        """Курсор назад возвращает предыдущую страницу."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        first_page = self.unauthorized_client.get(url).context['page_obj']
+        second_page = self.unauthorized_client.get(
+            url,
+            {'cursor': first_page.next_cursor}
+        ).context['page_obj']
+        previous_page = self.unauthorized_client.get(
+            url,
+            {'cursor': second_page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(previous_page), list(first_page))
+        self.assertEqual(previous_page.number, 1)
+        self.assertIsNone(previous_page.previous_cursor)
+
+    def test_paginator_invalid_cursor(self):
+        """Некорректный курсор открывает первую страницу."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        for cursor in ('abc', '!!!', 'WzEsInEiLFtdXQ'):
+            with self.subTest(cursor=cursor):
+                page_obj = self.unauthorized_client.get(
+                    url,
+                    {'cursor': cursor}
+                ).context['page_obj']
+                self.assertEqual(page_obj.number, 1)
+                self.assertEqual(
+                    len(page_obj),
+                    PaginatorViewsTest.posts_on_first_page
+                )
+
+    def test_paginator_count_is_cached(self):
+        """Число страниц считается один раз до появления нового поста."""
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        response = self.unauthorized_client.get(url)
+        self.assertContains(response, '1 из 2')
+        with CaptureQueriesContext(connection) as context:
+            self.unauthorized_client.get(url)
+        self.assertFalse(any(
+            'COUNT(' in query['sql'] for query in context.captured_queries
+        ))
+        for i in range(PaginatorViewsTest.posts_on_first_page):
+            Post.objects.create(
+                text=f'Новый пост #{i}',
+                author=self.user,
+                group=self.group
+            )
+        self.assertContains(self.unauthorized_client.get(url), '1 из 3')
+
+    @mock.patch('posts.paginators.estimate_count', return_value=10 ** 6)
+    def test_paginator_estimated_count(self, estimate_count):
+        """Размер большой таблицы оценивается по статистике базы."""
+        response = self.unauthorized_client.get(reverse('posts:index'))
+        self.assertContains(response, f'1 из ≈{10 ** 5}')
+
+
+class PostCardCacheTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тест-группа',
+            slug='test-slug',
+            description='Тест-описание',
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def test_card_cached_until_edit(self):
+        """Карточка рендерится один раз и обновляется после правки."""
+        post = Post.objects.create(
+            text='Старый текст',
+            author=self.user,
+            group=self.group
+        )
+        url = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        response = self.authorized_client.get(url)
+        self.assertTemplateUsed(response, 'posts/includes/post_card.html')
+        response = self.authorized_client.get(url)
+        self.assertTemplateNotUsed(response, 'posts/includes/post_card.html')
+        self.assertContains(response, 'Старый текст')
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.pk}),
+            {'text': 'Новый текст', 'group': self.group.pk}
+        )
+        response = self.authorized_client.get(url)
+        self.assertContains(response, 'Новый текст')
+        self.assertNotContains(response, 'Старый текст')
+
+    def test_cards_fetched_with_get_many(self):
+        """Карточки страницы читаются из кеша одним get_many."""
+        posts = [
+            Post.objects.create(text=f'Пост #{i}', author=self.user)
+            for i in range(3)
+        ]
+        first = cards.render_many(posts, '960x339')
+        with mock.patch.object(
+            cache, 'get_many', wraps=cache.get_many
+        ) as get_many, mock.patch(
+            'posts.cards.render_to_string'
+        ) as render_to_string:
+            self.assertEqual(cards.render_many(posts, '960x339'), first)
+        render_to_string.assert_not_called()
+        self.assertEqual(get_many.call_count, 2)
+
+
+class CardInvalidationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тест-группа',
+            slug='old-slug',
+            description='Тест-описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост',
+            author=cls.user,
+            group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_group_slug_change(self):
+        """Новый адрес группы сразу попадает в карточки лент."""
+        url = reverse('posts:index')
+        self.assertContains(self.guest_client.get(url), '/group/old-slug/')
+        self.group.slug = 'new-slug'
+        self.group.save()
+        response = self.guest_client.get(url)
+        self.assertContains(response, '/group/new-slug/')
+        self.assertNotContains(response, '/group/old-slug/')
+
+    def test_username_change(self):
+        """Новое имя автора сразу попадает в карточки и ленту группы."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'old-slug'}),
+        ]
+        etags = {url: self.guest_client.get(url)['ETag'] for url in urls}
+        self.user.username = 'renamed'
+        self.user.save()
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertContains(response, '/profile/renamed/')
+
+    def test_login_keeps_cards(self):
+        """Вход пользователя не сбрасывает его карточки."""
+        cards.render_many([self.post], '960x339')
+        self.user.save(update_fields=['last_login'])
+        User.objects.create_user(username='newcomer')
+        with mock.patch('posts.cards.render_to_string') as render:
+            cards.render_many([self.post], '960x339')
+        render.assert_not_called()
+        self.user.save()
+        with mock.patch(
+            'posts.cards.render_to_string', return_value=''
+        ) as render:
+            cards.render_many([self.post], '960x339')
+        render.assert_called_once()
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тест-группа',
+            slug='test-slug',
+            description='Тест-описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост',
+            author=cls.user,
+            group=cls.group
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_not_modified_until_change(self):
+        """Повторный запрос без изменений получает 304."""
+        urls = {
+            reverse('posts:index'): lambda: Post.objects.create(
+                text='Новый пост', author=self.user
+            ),
+            reverse(
+                'posts:group_list', kwargs={'slug': self.group.slug}
+            ): lambda: Post.objects.create(
+                text='Новый пост', author=self.user, group=self.group
+            ),
+            reverse(
+                'posts:profile', kwargs={'username': self.user.username}
+            ): lambda: Post.objects.create(
+                text='Новый пост', author=self.user
+            ),
+            reverse(
+                'posts:post_detail', kwargs={'post_id': self.post.pk}
+            ): lambda: Comment.objects.create(
+                post=self.post, author=self.user, text='Комментарий'
+            ),
+        }
+        for url, change in urls.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                etag = response['ETag']
+                response = self.guest_client.get(
+                    url,
+                    HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 304)
+                change()
+                response = self.guest_client.get(
+                    url,
+                    HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_stale_page_keeps_its_etag(self):
+        """Прошлая версия ленты, отданная во время пересчёта, не получает
+        ETag текущих версий."""
+        cache.clear()
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        Post.objects.create(text='Новый пост', author=self.user)
+        key = make_key('feed', url, None, *get_versions(['posts']))
+        cache.add(f'{key}:lock', 1)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Новый пост')
+        self.assertEqual(response['ETag'], etag)
+        cache.delete(f'{key}:lock')
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Новый пост')
+        self.assertNotEqual(response['ETag'], etag)
+        response = self.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_post_etag_changes_after_login(self):
+        """После повторного входа страница поста с формой комментария
+        отдаётся заново: в ней новый токен CSRF."""
+        User.objects.create_user(username='relogin', password='pass-8642')
+        client = Client(enforce_csrf_checks=True)
+        login_url = reverse('users:login')
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        client.get(login_url)
+        client.post(login_url, {
+            'username': 'relogin',
+            'password': 'pass-8642',
+            'csrfmiddlewaretoken': client.cookies['csrftoken'].value,
+        })
+        etag = client.get(url)['ETag']
+        client.logout()
+        client.get(login_url)
+        client.post(login_url, {
+            'username': 'relogin',
+            'password': 'pass-8642',
+            'csrfmiddlewaretoken': client.cookies['csrftoken'].value,
+        })
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        response = client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {
+                'text': 'Комментарий после входа',
+                'csrfmiddlewaretoken': response.context['csrf_token'],
+            }
+        )
+        self.assertTrue(
+            Comment.objects.filter(text='Комментарий после входа').exists()
+        )
+
+    def test_etag_depends_on_user(self):
+        """Гость и пользователь получают разные ETag."""
+        url = reverse('posts:index')
+        etag = self.guest_client.get(url)['ETag']
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.author = User.objects.create_user(username='writer')
+        cls.old_post = Post.objects.create(
+            text='Пост до подписки',
+            author=cls.author
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        cache.clear()
+
+    def get_feed(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_timeline_follow_unfollow(self):
+        """Лента пополняется при подписке и публикации,
+        очищается при отписке."""
+        Follow.objects.create(user=self.user, author=self.author)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user).count(),
+            2
+        )
+        self.assertEqual(self.get_feed(), [new_post, self.old_post])
+        Follow.objects.filter(user=self.user, author=self.author).delete()
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user).exists())
+        self.assertEqual(self.get_feed(), [])
+
+    @mock.patch('posts.timeline.FANOUT_LIMIT', 0)
+    def test_timeline_fallback_for_celebrity(self):
+        """Посты популярных авторов собираются при чтении."""
+        Follow.objects.create(user=self.user, author=self.author)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.get_feed(), [new_post, self.old_post])
+
+    @mock.patch('posts.timeline.FANOUT_LIMIT', 1)
+    def test_timeline_merged_with_celebrity_posts(self):
+        """Посты популярного автора сливаются с записями ленты, а не
+        заменяют её."""
+        celebrity = User.objects.create_user(username='celebrity')
+        fan = User.objects.create_user(username='fan')
+        Follow.objects.create(user=fan, author=celebrity)
+        Follow.objects.create(user=self.user, author=celebrity)
+        Follow.objects.create(user=self.user, author=self.author)
+        for i in range(3):
+            Post.objects.create(text=f'Обычный #{i}', author=self.author)
+            Post.objects.create(text=f'Популярный #{i}', author=celebrity)
+        expected = list(Post.objects.filter(
+            author__in=[self.author, celebrity]
+        ).order_by('-pub_date', '-id'))
+        paginator = timeline.get_paginator(self.user, 3)
+        self.assertIsInstance(paginator, MergedPaginator)
+        self.assertEqual(paginator.count, len(expected))
+        pages = [paginator.get_page(None)]
+        while pages[-1].next_cursor:
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual(
+            [post for page in pages for post in page.object_list],
+            expected
+        )
+        previous = paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual(list(previous.object_list), expected[-4:-1])
+        self.assertEqual(self.get_feed(), expected)
+
+    @mock.patch('posts.timeline.FANOUT_LIMIT', 1)
+    def test_timeline_restored_below_limit(self):
+        """Посты, опубликованные, пока автор был популярным, попадают
+        в ленты после отписок."""
+        reader = User.objects.create_user(username='another')
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=reader, author=self.author)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=new_post).exists()
+        )
+        Follow.objects.filter(user=reader).delete()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user).count(),
+            2
+        )
+        self.assertFalse(TimelineEntry.objects.filter(user=reader).exists())
+        self.assertEqual(self.get_feed(), [new_post, self.old_post])
+
+
+class CommentsPaginationTest(TestCase):
+    comments_count = COMMENTS_LIMIT + 5
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+        for i in range(cls.comments_count):
+            Comment.objects.create(
+                post=cls.post,
+                author=cls.user,
+                text=f'Комментарий #{i}'
+            )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_post_detail_renders_first_page(self):
+        """Страница поста выводит только первую страницу комментариев."""
+        response = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_LIMIT)
+        self.assertEqual(
+            comments[0].text,
+            f'Комментарий #{self.comments_count - 1}'
+        )
+        self.assertContains(response, comments.next_cursor)
+
+    def test_comment_list_fragment_and_json(self):
+        """Остальные комментарии отдаются фрагментом и в JSON."""
+        first_page = self.guest_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        ).context['comments']
+        url = reverse('posts:comment_list', kwargs={'post_id': self.post.pk})
+        response = self.guest_client.get(
+            url,
+            {'cursor': first_page.next_cursor}
+        )
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        self.assertEqual(len(response.context['comments']), 5)
+        self.assertContains(response, 'Комментарий #0')
+        self.assertNotContains(response, 'data-more-comments')
+        data = self.guest_client.get(
+            url,
+            {'cursor': first_page.next_cursor, 'format': 'json'}
+        ).json()
+        self.assertEqual(len(data['comments']), 5)
+        self.assertEqual(data['comments'][-1]['text'], 'Комментарий #0')
+        self.assertIsNone(data['next'])
+
+    def test_comment_list_unknown_post(self):
+        """Комментарии несуществующего поста - 404."""
+        response = self.guest_client.get(
+            reverse('posts:comment_list', kwargs={'post_id': 0})
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        buffer = BytesIO()
+        Image.new('RGB', (40, 30), 'red').save(buffer, 'PNG')
+        cls.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=cls.user,
+            image=SimpleUploadedFile(
+                name='red.png',
+                content=buffer.getvalue(),
+                content_type='image/png'
+            )
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.guest_client = Client()
+        cache.clear()
+        # Миниатюры, созданные другим тестом класса, удаляются.
+        shutil.rmtree(
+            os.path.join(TEMP_MEDIA_ROOT, 'cache'), ignore_errors=True
+        )
+
+    def test_placeholder_until_thumbnail_is_ready(self):
+        """До создания миниатюр выводится заглушка, после - srcset."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.assertIsNone(
+            thumbnails.get_sources(self.post.image, '1920x1080')
+        )
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'aspect-ratio: 1920 / 1080')
+        thumbnails.generate(self.post.image.name)
+        for geometry, image_format in thumbnails.variants():
+            with self.subTest(geometry=geometry, image_format=image_format):
+                self.assertIsNotNone(thumbnails.backend.get_ready(
+                    self.post.image,
+                    geometry,
+                    format=image_format,
+                    **thumbnails.OPTIONS
+                ))
+        sources = thumbnails.get_sources(self.post.image, '1920x1080')
+        self.assertEqual(len(sources), len(thumbnails.FORMATS))
+        self.assertEqual(
+            sources[-1]['srcset'].count('w,'),
+            len(thumbnails.WIDTHS) - 1
+        )
+        response = self.guest_client.get(url)
+        self.assertContains(response, sources[-1]['srcset'])
+        self.assertNotContains(response, 'aspect-ratio')
+
+    def test_placeholder_card_not_cached(self):
+        """Карточка с заглушкой рендерится заново, пока нет миниатюр."""
+        posts = [self.post]
+        cards.render_many(posts, '960x339')
+        with mock.patch(
+            'posts.cards.render_to_string', return_value=''
+        ) as render:
+            cards.render_many(posts, '960x339')
+            render.assert_called_once()
+            thumbnails.generate(self.post.image.name)
+            cards.render_many(posts, '960x339')
+            cards.render_many(posts, '960x339')
+            self.assertEqual(render.call_count, 2)
+
+    @mock.patch('posts.thumbnails._executor')
+    @mock.patch(
+        'posts.thumbnails.transaction.on_commit',
+        side_effect=lambda callback: callback()
+    )
+    def test_pages_refreshed_when_thumbnail_is_ready(self, on_commit,
+                                                     executor):
+        """Готовые миниатюры сбрасывают кеш лент и ETag страниц."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'auth'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        ]
+        etags = {}
+        for url in urls:
+            response = self.guest_client.get(url)
+            self.assertContains(response, 'aspect-ratio: ')
+            etags[url] = response['ETag']
+        executor.submit.assert_called_once()
+        thumbnails.generate(self.post.image.name)
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'srcset')
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Ёжики в тумане',
+            slug='hedgehogs',
+            description='Тест-описание',
+        )
+        cls.post = Post.objects.create(
+            text='Ёжик <b>заблудился</b> в тумане',
+            author=cls.user,
+            group=cls.group
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.post,
+            author=cls.user,
+            text='ёжика нашёл медвежонок'
+        )
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def search(self, query, **params):
+        return self.guest_client.get(
+            reverse('posts:search'),
+            {'q': query, **params}
+        )
+
+    def found(self, response):
+        return [
+            (result.kind, result.object)
+            for result in response.context['results'].object_list
+        ]
+
+    def test_search_posts_comments_groups(self):
+        """Поиск по префиксу слова без учёта регистра."""
+        response = self.search('ЁЖИК')
+        self.assertCountEqual(
+            self.found(response),
+            [
+                ('post', self.post),
+                ('comment', self.comment),
+                ('group', self.group),
+            ]
+        )
+        self.assertContains(response, '<mark>Ёжик</mark>')
+        self.assertContains(response, '&lt;b&gt;заблудился&lt;/b&gt;')
+
+    def test_search_index_follows_changes(self):
+        """Индекс обновляется при изменении и удалении записей."""
+        self.comment.text = 'Медвежонок нашёл друга'
+        self.comment.save()
+        self.assertNotIn(('comment', self.comment), self.found(
+            self.search('ЁЖИК')
+        ))
+        post = Post.objects.create(text='Туманность', author=self.user)
+        self.assertIn(('post', post), self.found(self.search('туманность')))
+        post.delete()
+        self.assertEqual(self.found(self.search('туманность')), [])
+
+    def test_search_pages(self):
+        """Результаты выдаются страницами по курсору."""
+        for i in range(LIMIT + 2):
+            Post.objects.create(text=f'Облако #{i}', author=self.user)
+        first = self.search('облако').context['results']
+        self.assertEqual(len(first.object_list), LIMIT)
+        second = self.search(
+            'облако',
+            cursor=first.next_cursor
+        ).context['results']
+        self.assertEqual(len(second.object_list), 2)
+        self.assertIsNone(second.next_cursor)
+        self.assertFalse(
+            {result.object for result in first.object_list}
+            & {result.object for result in second.object_list}
+        )
+        for cursor in ('!!!', encode_cursor([[1], [2]]), encode_cursor(
+            [True, 'x']
+        ), encode_cursor({'rank': 1})):
+            with self.subTest(cursor=cursor):
+                broken = self.search(
+                    'облако', cursor=cursor
+                ).context['results']
+                self.assertEqual(broken.object_list, first.object_list)
+
+    def test_empty_query(self):
+        """Пустой запрос и запрос из знаков препинания."""
+        self.assertIsNone(self.search('').context['results'])
+        self.assertEqual(self.found(self.search('"*')), [])
@@ -0,0 +1,206 @@
+"""Фоновая генерация миниатюр картинок постов.
+
+Для каждой пропорции, которую выводят шаблоны, создаются миниатюры
+нескольких ширин (для srcset) в WebP, если Pillow его поддерживает, и
+в JPEG для старых браузеров. Миниатюры создаются в пуле потоков после
+сохранения поста через форму, а также когда шаблон не нашёл миниатюр
+у картинки (так восстанавливаются потерянные задания); до их появления
+выводится заглушка, поэтому запрос страницы никогда не ждёт обработки
+картинки.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import features
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import cache
+
+logger = logging.getLogger(__name__)
+
+OPTIONS = {'crop': 'center', 'upscale': True}
+ASPECTS = ('1920x1080', '960x339')
+WIDTHS = (320, 640, 1280, 1920)
+FORMATS = (('WEBP', 'image/webp'),) if features.check('webp') else ()
+FORMATS += (('JPEG', 'image/jpeg'),)
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.THUMBNAIL_WORKERS,
+    thread_name_prefix='thumbnails'
+)
+_pending = {}
+# Пространства имён страниц с картинкой, ждущих её миниатюр.
+_waiting = {}
+_lock = threading.Lock()
+
+
+class ReadyThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl-thumbnail, разделяющий поиск и создание миниатюры.
+
+    Готовность миниатюры определяется наличием файла, а не записью в
+    хранилище ключей sorl, поэтому пул потоков не пишет в базу данных.
+    """
+
+    def resolve(self, file_, geometry_string, **options):
+        """Исходник, файл миниатюры и итоговые параметры, как у sorl."""
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return source, ImageFile(name, default.storage), options
+
+    def get_ready(self, file_, geometry_string, **options):
+        """Готовая миниатюра или None, если файла ещё нет."""
+        _, thumbnail, _ = self.resolve(file_, geometry_string, **options)
+        return thumbnail if thumbnail.exists() else None
+
+    def create(self, file_, geometry_string, **options):
+        """Создание файла миниатюры, если его ещё нет."""
+        source, thumbnail, options = self.resolve(
+            file_, geometry_string, **options
+        )
+        if thumbnail.exists():
+            return
+        source_image = default.engine.get_image(source)
+        try:
+            options['image_info'] = default.engine.get_image_info(
+                source_image
+            )
+            source.set_size(default.engine.get_image_size(source_image))
+            self._create_thumbnail(
+                source_image, geometry_string, options, thumbnail
+            )
+        finally:
+            default.engine.cleanup(source_image)
+
+
+backend = ReadyThumbnailBackend()
+
+
+def geometries(aspect):
+    """Размеры миниатюр всех ширин с пропорцией aspect."""
+    width, height = (int(side) for side in aspect.split('x'))
+    return [f'{size}x{round(size * height / width)}' for size in WIDTHS]
+
+
+def variants():
+    """Все миниатюры картинки в порядке их создания."""
+    for aspect in ASPECTS:
+        for image_format, _ in FORMATS:
+            for geometry in geometries(aspect):
+                yield geometry, image_format
+
+
+def get_sources(image, aspect):
+    """Наборы srcset по форматам или None, пока миниатюры создаются.
+
+    Адреса миниатюр только вычисляются, без обращения к хранилищу.
+    """
+    if is_ready(image):
+        return [
+            _source(image, aspect, image_format, content_type)
+            for image_format, content_type in FORMATS
+        ]
+    schedule(image)
+    return None
+
+
+def is_ready(image):
+    """Созданы ли миниатюры картинки (без постановки в очередь).
+
+    Миниатюры создаются одним заданием по порядку, поэтому готовность
+    проверяется по последней из них.
+    """
+    if not image:
+        return False
+    geometry, image_format = list(variants())[-1]
+    return backend.get_ready(
+        image, geometry, format=image_format, **OPTIONS
+    ) is not None
+
+
+def _source(image, aspect, image_format, content_type):
+    urls = []
+    for size, geometry in zip(WIDTHS, geometries(aspect)):
+        _, thumbnail, _ = backend.resolve(
+            image, geometry, format=image_format, **OPTIONS
+        )
+        urls.append((thumbnail.url, size))
+    return {
+        'type': content_type,
+        'src': urls[-1][0],
+        'srcset': ', '.join(f'{url} {size}w' for url, size in urls),
+    }
+
+
+def page_namespaces(image):
+    """Пространства имён страниц, выводящих пост с картинкой image."""
+    post = getattr(image, 'instance', None)
+    if post is None or post.pk is None:
+        return []
+    names = ['posts', f'post:{post.pk}', f'author:{post.author_id}']
+    if post.group_id is not None:
+        names.append(f'group:{post.group_id}')
+    return names
+
+
+def schedule(image):
+    """Постановка генерации миниатюр в очередь после коммита."""
+    if image:
+        name = image.name
+        namespaces = page_namespaces(image)
+        transaction.on_commit(lambda: _submit(name, namespaces))
+
+
+def _submit(name, namespaces=()):
+    with _lock:
+        _waiting.setdefault(name, set()).update(namespaces)
+        if name in _pending:
+            return
+        _pending[name] = _executor.submit(generate, name)
+
+
+def wait():
+    """Ожидание поставленных заданий (для тестов с временным MEDIA_ROOT)."""
+    with _lock:
+        futures = list(_pending.values())
+    wait_futures(futures)
+
+
+def generate(name):
+    """Создание всех миниатюр картинки (в потоке пула).
+
+    Затем увеличиваются версии 'image:<имя>' и страниц постов с этой
+    картинкой: закешированные карточки и страницы с заглушкой
+    перерисовываются, а их ETag меняются.
+    """
+    try:
+        if default_storage.exists(name):
+            for geometry, image_format in variants():
+                backend.create(
+                    name, geometry, format=image_format, **OPTIONS
+                )
+            with _lock:
+                namespaces = _waiting.pop(name, set())
+            cache.bump(f'image:{name}', *namespaces)
+    except Exception:
+        logger.exception('Не удалось создать миниатюры %s', name)
+    finally:
+        with _lock:
+            _pending.pop(name, None)
+            _waiting.pop(name, None)
@@ -0,0 +1,189 @@
+"""Лента подписок, материализованная при записи (fan-out-on-write).
+
+Новый пост раскладывается по лентам подписчиков автора, поэтому чтение
+ленты - один проход по индексу (user, pub_date). Посты авторов, у
+которых подписчиков больше FANOUT_LIMIT, не раскладываются: при чтении
+они выбираются из постов и сливаются с записями ленты; когда после
+отписок подписчиков снова становится FANOUT_LIMIT, все посты автора
+раскладываются заново (restore).
+"""
+from django.db import connection
+
+from .models import Follow, Post, TimelineEntry, UserCounters
+from .paginators import KeysetPaginator, MergedPaginator
+
+FANOUT_LIMIT = 1000
+BATCH_SIZE = 500
+
+
+class TimelinePaginator(KeysetPaginator):
+    """Пагинация записей ленты с выдачей самих постов."""
+
+    def __init__(self, object_list, per_page):
+        super().__init__(
+            object_list.select_related('post__author', 'post__group'),
+            per_page,
+            keys=('-pub_date', '-post_id')
+        )
+
+    def transform(self, rows):
+        return [entry.post for entry in rows]
+
+
+def is_celebrity(author_id):
+    """Слишком много подписчиков для раскладки по лентам."""
+    return UserCounters.objects.filter(
+        user_id=author_id,
+        followers_count__gt=FANOUT_LIMIT
+    ).exists()
+
+
+def fan_out(post):
+    """Раскладка нового поста по лентам подписчиков автора."""
+    if is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post=post,
+                author_id=post.author_id,
+                pub_date=post.pub_date
+            )
+            for user_id in followers.iterator()
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавление постов автора в ленту нового подписчика."""
+    if is_celebrity(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('id', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=user_id,
+                post_id=post_id,
+                author_id=author_id,
+                pub_date=pub_date
+            )
+            for post_id, pub_date in posts.iterator()
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def trim(user_id, author_id):
+    """Удаление постов автора из ленты отписавшегося."""
+    TimelineEntry.objects.filter(
+        user_id=user_id,
+        author_id=author_id
+    ).delete()
+
+
+def follows_celebrity(user):
+    """Подписан ли пользователь на авторов без раскладки по лентам."""
+    return Follow.objects.filter(
+        user=user,
+        author__counters__followers_count__gt=FANOUT_LIMIT
+    ).exists()
+
+
+def get_sources(user):
+    """Записи ленты пользователя и посты его популярных авторов.
+
+    Посты популярных авторов в ленты не раскладываются; если таких
+    подписок нет, вместо их выборки - None. Записи ленты, оставшиеся
+    с тех пор, когда автор не был популярным, исключаются: его посты
+    берутся из второй выборки.
+    """
+    entries = TimelineEntry.objects.filter(user=user)
+    if not follows_celebrity(user):
+        return entries, None
+    authors = Follow.objects.filter(
+        user=user,
+        author__counters__followers_count__gt=FANOUT_LIMIT
+    ).values('author_id')
+    return (
+        entries.exclude(author_id__in=authors),
+        Post.objects.filter(author_id__in=authors)
+    )
+
+
+def get_paginator(user, per_page):
+    """Пагинатор ленты подписок пользователя.
+
+    Записи ленты сливаются с постами популярных авторов по ключу
+    (pub_date, id): страница - по одному запросу к каждой выборке.
+    """
+    entries, posts = get_sources(user)
+    paginator = TimelinePaginator(entries, per_page)
+    if posts is None:
+        return paginator
+    return MergedPaginator([
+        paginator,
+        KeysetPaginator(posts.select_related('author', 'group'), per_page),
+    ], per_page)
+
+
+def restore(author_id):
+    """Раскладка всех постов автора, у которого подписчиков снова стало
+    FANOUT_LIMIT, по лентам подписчиков.
+
+    Пока автор был популярным, его посты в ленты не попадали; без
+    раскладки они пропали бы из лент, собираемых из записей.
+    """
+    if not UserCounters.objects.filter(
+        user_id=author_id,
+        followers_count=FANOUT_LIMIT
+    ).exists():
+        return
+    _insert_select(Follow.objects.filter(
+        author_id=author_id,
+        author__posts__isnull=False
+    ))
+
+
+def rebuild():
+    """Раскладка по лентам всех постов, загруженных в обход сигналов.
+
+    Счётчики подписчиков должны быть пересчитаны заранее.
+    """
+    _insert_select(Follow.objects.filter(
+        author__counters__followers_count__lte=FANOUT_LIMIT,
+        author__posts__isnull=False
+    ))
+
+
+def _insert_select(follows):
+    """Записи лент для постов авторов подписок follows.
+
+    Записи создаются одним INSERT ... SELECT в базе, без загрузки строк
+    в Python; уже существующие пропускаются.
+    """
+    rows = follows.values_list(
+        'user_id', 'author__posts__id', 'author_id', 'author__posts__pub_date'
+    )
+    select, params = rows.query.sql_with_params()
+    opts = TimelineEntry._meta
+    columns = ', '.join(
+        connection.ops.quote_name(opts.get_field(name).column)
+        for name in ('user', 'post', 'author', 'pub_date')
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'{connection.ops.insert_statement(ignore_conflicts=True)} '
+            f'{connection.ops.quote_name(opts.db_table)} ({columns}) '
+            f'{select}'
+            f'{connection.ops.ignore_conflicts_suffix_sql(True)}',
+            params
+        )
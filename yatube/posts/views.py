@@ -1,26 +1,87 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.views.decorators.http import etag
 
+from core.routers import read_from_replica
+
+from . import search, thumbnails, timeline
+from .cache import cache_feed, versions_etag
 from .forms import PostForm, CommentForm
 from .models import Post, Group, Follow, User
+from .paginators import KeysetPaginator
 
 User = get_user_model()
 
 
 LIMIT = 10
+COMMENTS_LIMIT = 20
 
 
 def get_paginator(posts, request):
-    """Пагинация."""
-    paginator = Paginator(posts, LIMIT)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    """Пагинация по курсору (pub_date, id)."""
+    paginator = KeysetPaginator(posts, LIMIT)
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+def get_comments(post, request):
+    """Страница комментариев поста по курсору (created, id)."""
+    paginator = KeysetPaginator(
+        post.comments.select_related('author'),
+        COMMENTS_LIMIT,
+        keys=('-created', '-id')
+    )
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+def index_etag(request):
+    """ETag главной страницы."""
+    return versions_etag(request, 'posts')
+
+
+def group_etag(request, slug):
+    """ETag страницы группы."""
+    group_id = Group.objects.filter(
+        slug=slug
+    ).values_list('pk', flat=True).first()
+    if group_id is not None:
+        return versions_etag(request, f'group:{group_id}')
+
 
+def profile_etag(request, username):
+    """ETag профайла."""
+    author_id = User.objects.filter(
+        username=username
+    ).values_list('pk', flat=True).first()
+    if author_id is not None:
+        return versions_etag(request, f'author:{author_id}')
 
-@cache_page(20)
+
+def post_etag(request, post_id):
+    """ETag страницы поста."""
+    # Без сортировки постов по дате: это выборка по первичному ключу.
+    posts = Post.objects.filter(
+        id=post_id
+    ).order_by().values_list('author_id', 'group_id')[:1]
+    for author_id, group_id in posts:
+        return versions_etag(
+            request,
+            f'post:{post_id}',
+            f'author:{author_id}',
+            f'group:{group_id}',
+            csrf=True
+        )
+
+
+def follow_etag(request):
+    """ETag ленты подписок."""
+    return versions_etag(request, 'posts', f'follow:{request.user.pk}')
+
+
+@read_from_replica
+@etag(index_etag)
+@cache_feed('posts')
 def index(request):
     """Главная страница."""
     post_list = Post.objects.select_related('author', 'group')
@@ -32,10 +93,12 @@ def index(request):
     return render(request, template, context)
 
 
+@read_from_replica
+@etag(group_etag)
 def group_posts(request, slug):
     """Страница с постами, отсортированными по группам."""
     group = get_object_or_404(Group, slug=slug)
-    post_list = Post.objects.filter(group=group)
+    post_list = group.posts.select_related('author', 'group')
     page_obj = get_paginator(post_list, request)
     template = 'posts/group_list.html'
     context = {
@@ -45,10 +108,15 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@read_from_replica
+@etag(profile_etag)
 def profile(request, username):
     """Профайл пользователя."""
-    author = get_object_or_404(User, username=username)
-    post_list = Post.objects.filter(author=author)
+    author = get_object_or_404(
+        User.objects.select_related('counters'),
+        username=username
+    )
+    post_list = author.posts.select_related('author', 'group')
     page_obj = get_paginator(post_list, request)
     template = 'posts/profile.html'
     following = False
@@ -65,11 +133,15 @@ def profile(request, username):
     return render(request, template, context)
 
 
+@etag(post_etag)
 def post_detail(request, post_id):
     """Страница поста."""
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__counters', 'group'),
+        id=post_id
+    )
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
+    comments = get_comments(post, request)
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
@@ -84,10 +156,50 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+def comment_list(request, post_id):
+    """Следующая страница комментариев: HTML-фрагмент или JSON."""
+    post = get_object_or_404(Post.objects.only('id'), id=post_id)
+    comments = get_comments(post, request)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    'id': comment.id,
+                    'author': comment.author.username,
+                    'text': comment.text,
+                    'created': comment.created,
+                }
+                for comment in comments
+            ],
+            'next': comments.next_cursor,
+        })
+    context = {
+        'post': post,
+        'comments': comments,
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
+def post_search(request):
+    """Поиск по постам, комментариям и группам."""
+    query = request.GET.get('q', '').strip()
+    results = None
+    if query:
+        results = search.find(query, LIMIT, request.GET.get('cursor'))
+    context = {
+        'query': query,
+        'results': results,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     """Создание поста."""
-    form = PostForm(request.POST or None)
+    form = PostForm(
+        request.POST or None,
+        files=request.FILES or None
+    )
     if not form.is_valid():
         template = 'posts/create_post.html'
         context = {
@@ -98,6 +210,7 @@ def post_create(request):
     post = form.save(commit=False)
     post.author = request.user
     post.save()
+    thumbnails.schedule(post.image)
     return redirect(
         'posts:profile',
         username=post.author.username
@@ -129,7 +242,10 @@ def post_edit(request, post_id):
             'posts/create_post.html',
             context
         )
-    form.save()
+    # Счётчики меняются в обход формы, их не перезаписываем.
+    post = form.save(commit=False)
+    post.save(update_fields=PostForm.Meta.fields)
+    thumbnails.schedule(post.image)
     return redirect(
         'posts:post_detail',
         post_id=post_id
@@ -153,11 +269,13 @@ def add_comment(request, post_id):
 
 
 @login_required
+@read_from_replica
+@etag(follow_etag)
+@cache_feed('posts', 'follow:{user}')
 def follow_index(request):
     """Информация о текущем пользователе."""
-    post_list = Post.objects.filter(
-        author__following__user=request.user)
-    page_obj = get_paginator(post_list, request)
+    paginator = timeline.get_paginator(request.user, LIMIT)
+    page_obj = paginator.get_page(request.GET.get('cursor'))
     context = {
         'page_obj': page_obj,
     }
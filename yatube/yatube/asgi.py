@@ -0,0 +1,13 @@
+import os
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from core.asgi import WSGIBridge
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+application = WSGIBridge(
+    get_wsgi_application(),
+    max_workers=settings.ASGI_THREADS
+)
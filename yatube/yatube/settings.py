@@ -41,6 +41,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.routers.ReadAfterWriteMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -67,6 +68,9 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+# ASGI: yatube.asgi.application (core.asgi), виды выполняются в пуле
+# из ASGI_THREADS потоков.
+ASGI_THREADS = 32
 
 
 DATABASES = {
@@ -76,6 +80,34 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения лент: пути к копиям базы через запятую в
+# DATABASE_REPLICAS. REPLICA_LAG - сколько секунд после изменения клиент
+# читает с основной базы.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+    filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')), 1
+):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+REPLICA_LAG = 10
+
+# Настройки каждого нового соединения с SQLite (core.db): WAL не даёт
+# записи блокировать чтение, busy_timeout - ожидание вместо ошибки
+# "database is locked". cache_size < 0 - размер в КиБ.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+}
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -115,12 +147,49 @@ LOGIN_REDIRECT_URL = 'posts:index'
 # LOGOUT_REDIRECT_URL = 'posts:index'
 
 
+# Кеш выбирается переменными окружения: CACHE_BACKEND - псевдоним из
+# CACHE_BACKENDS или путь к классу бэкенда, CACHE_LOCATION - каталог,
+# таблица или адрес сервера кеша. file, db и memcached общие для всех
+# процессов сервера, locmem и lru (core.cache) - у каждого свой.
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'db': 'django.core.cache.backends.db.DatabaseCache',
+    'memcached': 'django.core.cache.backends.memcached.MemcachedCache',
+    'pylibmc': 'django.core.cache.backends.memcached.PyLibMCCache',
+    'lru': 'core.cache.LRUCache',
+}
+CACHE_LOCATIONS = {
+    'file': os.path.join(BASE_DIR, 'cache'),
+    'db': 'yatube_cache',
+    'memcached': '127.0.0.1:11211',
+    'pylibmc': '127.0.0.1:11211',
+}
+CACHE_OPTIONS = {
+    'lru': {
+        'MAX_BYTES': int(os.getenv('CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+        'STATS_DIR': os.getenv('CACHE_STATS_DIR'),
+    },
+}
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'locmem')
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': CACHE_BACKENDS.get(CACHE_BACKEND, CACHE_BACKEND),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            CACHE_LOCATIONS.get(CACHE_BACKEND, '')
+        ),
+        'OPTIONS': CACHE_OPTIONS.get(CACHE_BACKEND, {}),
     }
 }
 
+# Страницы лент сбрасываются сигналами, таймаут - лишь верхняя граница.
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
+
+# Поисковый индекс: FTS5 для SQLite, LikeSearchBackend для прочих баз.
+SEARCH_BACKEND = 'posts.search.SQLiteFTSBackend'
+
 
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
@@ -129,5 +198,8 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Потоки фоновой генерации миниатюр.
+THUMBNAIL_WORKERS = 2
+
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'